@@ -1,15 +1,22 @@
+import time
+_START = time.perf_counter()
 import sys,os  # noqa: E401
+import multiprocessing
+import threading
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QIcon
+from PyQt6.QtCore import QTimer
+# cv2 / numpy / PIL / requests / websocket 均在第一次使用时才导入，不拖慢首个窗口
 from src.ImageBatchProcessor_model import ImageBatchModel
 from src.ImageBatchProcessor_presenter import ImageBatchPresenter
-from src.comfyui_api.comfyui_presnter import ComfyUIPresenter
 from src.ui.ImageBatchProcessor_view import ImageBatchView
 sys.path.append(os.path.dirname(__file__))
 from src import __version__ 
 from src import get_resource_path
-import winreg
+from src.startup_timer import StartupTimer
 def add_proxy_override(new_entry: str):
+    import winreg
+
     reg_path = r"Software\Microsoft\Windows\CurrentVersion\Internet Settings"
     reg_value = "ProxyOverride"
 
@@ -31,8 +38,29 @@ def add_proxy_override(new_entry: str):
     winreg.CloseKey(key)
     print(f"已追加: {new_entry}")
     
+def attach_comfy_presenter(model, main_presenter, comfy_view):
+    """ComfyUI 页创建之后再导入 ComfyUI 相关模块（requests / websocket）并连接 Presenter"""
+    from src.comfyui_api.comfyui_presnter import ComfyUIPresenter
+
+    comfy_presenter = ComfyUIPresenter(model, comfy_view)
+    main_presenter.set_comfy_presenter(comfy_presenter)
+    if model.output_dir:
+        comfy_presenter.set_output_dir(model.output_dir)
+    return comfy_presenter
+
+def prewarm_pipeline():
+    """后台预先导入图像处理模块，第一次处理或预览时不用再等"""
+    import src.ImageBatchProcessor_utils  # noqa: F401
+
 if __name__ == "__main__":
+    # 进程池后端在打包后的 exe 中需要
+    multiprocessing.freeze_support()
+    # --profile-startup：打印启动各阶段耗时后退出；环境变量 IBP_PROFILE_STARTUP=1：打印后继续运行
+    exit_after_profile = "--profile-startup" in sys.argv
+    timer = StartupTimer(exit_after_profile or os.environ.get("IBP_PROFILE_STARTUP") == "1", start=_START)
+    timer.mark("导入界面模块")
     add_proxy_override("100.83.*")
+    timer.mark("代理设置")
     app = QApplication(sys.argv)
     app.setApplicationName(f"ImageBatchProcessor v{__version__}")
     base_dir = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__)))
@@ -46,16 +74,29 @@ if __name__ == "__main__":
     except Exception as e:
         print("QSS 加载失败:", e)
     # 加载 QSS 样式
+    timer.mark("创建 QApplication + 样式表")
 
-        
     model = ImageBatchModel()
     view = ImageBatchView()
+    timer.mark("创建主窗口")
     main_presenter = ImageBatchPresenter(model, view)
-    comfy_view = view.comfy_section
 
-    comfy_presenter = ComfyUIPresenter(model, comfy_view) 
-    main_presenter.set_comfy_presenter(comfy_presenter)
+    def on_comfy_section_ready(comfy_view):
+        # 主窗口显示后由 view 创建 ComfyUI 页
+        timer.mark("首帧 + 创建 ComfyUI 页")
+        attach_comfy_presenter(model, main_presenter, comfy_view)
+        timer.mark("创建 ComfyUI Presenter")
+        if timer.enabled:
+            print(timer.report())
+        if exit_after_profile:
+            QTimer.singleShot(0, app.quit)
+        else:
+            threading.Thread(target=prewarm_pipeline, name="prewarm", daemon=True).start()
+
+    view.comfy_section_ready.connect(on_comfy_section_ready)
     # 让 view 主动发出初始状态
     view.emit_initial_signals()
+    timer.mark("连接 Presenter")
     view.show()
+    timer.mark("显示主窗口")
     sys.exit(app.exec())
\ No newline at end of file
@@ -1,55 +1,460 @@
+import itertools
+import logging
 import os
-from pathlib import Path
-from src.ImageBatchProcessor_utils import process_image_v5
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, TYPE_CHECKING
+from functools import partial
 from src.config import ImageProcessConfig
+from src.file_registry import FileRegistry
+from src.pipeline.streaming import Stage, StagedPipeline
+from src.pipeline.metrics import ImageMetrics, queue_wait_since, stamped, timed
+
+# cv2 / numpy / PIL 等重模块在第一次处理时才导入，界面启动时不加载
+if TYPE_CHECKING:
+    from src.pipeline.encoder import EncodedImage
+
+logger = logging.getLogger(__name__)
+
 
 class ImageBatchModel:
     def __init__(self):
-        self.files = []
+        self.files = FileRegistry()
         self.output_dir = ""
 
     def set_output_dir(self, path):
-        print('set_output_dir: ', path)
+        logger.debug("set_output_dir: %s", path)
         self.output_dir = path
 
     def add_files(self, paths):
-        valid_files = []
-        for f in paths:
-            f = os.path.abspath(f)
-            if os.path.isdir(f):
-                for img in os.listdir(f):
-                    if img.lower().endswith((".png", ".jpg", ".jpeg")):
-                        valid_files.append(os.path.join(f, img))
-            elif f.lower().endswith((".png", ".jpg", ".jpeg")):
-                valid_files.append(f)
-        added_files = []
-        for f in valid_files:
-            # 将字符串转变成path类型
-            f = Path(f)
-            if f not in self.files:
-                self.files.append(f)
-                added_files.append(f)
-        return added_files
-
-    def process_one(self, file, config: ImageProcessConfig):
-        """处理单张图片并保存"""
-        print('process_one file: ', file)
+        """
+        加入文件或目录（递归扫描子目录），按文件头识别图片，损坏或不是图片的文件直接跳过
+        :return: 新加入的 [(序号, 路径)]，已存在的跳过
+        """
+        from src.pipeline.scanner import scan_images
+
+        rejected = []
+        infos = scan_images(paths, rejected=rejected)
+        for path in rejected:
+            logger.warning("⚠️ 无法识别的图片，已跳过: %s", path)
+        return [(index, info.path) for index, info in self.add_scanned(infos)]
+
+    def add_scanned(self, infos):
+        """
+        加入扫描结果（ImageInfo），返回新加入的 [(序号, ImageInfo)]；界面边扫描边分块调用
+        ImageInfo 随文件记入登记表，同尺寸分组时直接使用
+        """
+        added = []
+        for info in infos:
+            index = self.files.add(info.path, info)
+            if index is not None:
+                added.append((index, info))
+        return added
+
+    def remove_files(self, paths) -> int:
+        return self.files.remove_many(paths)
+
+    def remove_indices(self, indices) -> int:
+        return self.files.remove_indices(indices)
+
+    def process_one(self, file, config: ImageProcessConfig, collect_metrics: bool = False):
+        """处理单张图片并保存；collect_metrics 时 OutputRecord.metrics 带逐阶段耗时"""
+        metrics = ImageMetrics() if collect_metrics else None
+        return process_file(file, self.output_dir, config, metrics=metrics)
+
+    def expected_outputs(self, config: ImageProcessConfig) -> int:
+        """本次处理将生成的图片数量（文件数 × 每张变体数）"""
+        return len(self.files) * max(1, config.variants_per_image)
+
+    def process_all(self, config: ImageProcessConfig, progress_callback=None, collect_metrics: bool = False):
+        """
+        按配置的执行器并行处理所有文件
+        每个源文件生成 variants_per_image 个独立随机的输出，源图只解码一次
+        config.resume 时按输出目录中的运行清单跳过已完成项，跳过的项先回报（OutputRecord.skipped）
+        :param progress_callback: 可选，回调 (已完成数, 文件, OutputRecord 或 None, 异常或 None)，按完成顺序调用
+        :param collect_metrics: 记录每张图的解码/变换/编码/写盘耗时、字节数和排队等待（OutputRecord.metrics）
+        :return: 失败列表 [(文件, 异常)]
+        :raises ValueError: 参数不合法（整批开始前校验）
+        """
+        from src.pipeline.encoder import OUTPUT_FORMATS, normalize_format
+        from src.pipeline.executor import make_executor
+        from src.pipeline.manifest import RunManifest, config_hash
+        from src.pipeline.naming import OutputNamer
+        from src.pipeline.plan import compile_plan
+
+        # 配置每批只编译一次
+        plan = compile_plan(config)
         if not self.output_dir or not os.path.isdir(self.output_dir):
             os.makedirs(self.output_dir, exist_ok=True)
+        items = variant_items(self.files, config.variants_per_image)
+
+        manifest, cfg_hash, src_hashes, skipped = None, None, {}, []
+        if config.resume:
+            manifest = RunManifest.for_output_dir(self.output_dir)
+            cfg_hash = config_hash(config)
+            items, skipped, src_hashes = manifest.split(items, cfg_hash, config.hash_content)
+            if skipped:
+                logger.info("⏭️ 运行清单中已完成 %d 项，跳过", len(skipped))
+
+        done = 0
+        for file, variant in skipped:
+            done += 1
+            if progress_callback:
+                entry = manifest.entries[manifest.key(file, variant)]
+                record = OutputRecord(entry["output"], entry.get("bytes", 0), 0.0, skipped=True)
+                progress_callback(done, file, record, None)
+
+        # 输出名在提交前按输入顺序一次分配好，随任务一起传给执行器（进程池中也不会重名）
+        namer = OutputNamer(self.output_dir, config.overwrite, config.name_template)
+        # 跳过项的输出仍然有效，先占住，新加入的同名源图不能覆盖它们（允许覆盖时目录快照为空）
+        for file, variant in skipped:
+            namer.claim(manifest.entries[manifest.key(file, variant)]["output"])
+        ext = OUTPUT_FORMATS[normalize_format(config.output_format)]
+        tasks = [(file, variant, namer.reserve(file, variant, ext)) for file, variant in items]
+
+        if config.batch_size > 1:
+            results = self._run_batches(tasks, config, plan, collect_metrics)
+        elif config.executor == "stream":
+            results = run_stream_pipeline(build_stream_pipeline(self.output_dir, config, plan=plan,
+                                                                collect_metrics=collect_metrics),
+                                          tasks, config.workers)
+        else:
+            executor = make_executor(config.executor, config.workers)
+            if executor.kind == "process" and config.variants_per_image > 1:
+                results = self._run_per_source(executor, tasks, config, plan, collect_metrics)
+            else:
+                task = partial(process_item, output_dir=self.output_dir, config=config, plan=plan,
+                               collect_metrics=collect_metrics)
+                results = ((entry[0], record, error) for entry, record, error in executor.run(task, stamped(tasks)))
+        failures = []
+        try:
+            for done, ((file, variant, *_), record, error) in enumerate(results, start=done + 1):
+                if error is not None:
+                    logger.info("❌ 处理失败: %s: %s", file, error)
+                    failures.append((file, error))
+                else:
+                    # 逐张结果经 progress_callback 交给调用方显示，这里只留调试日志，避免大批量时刷屏
+                    logger.debug("%s: %d 字节, 编码 %.1f ms", record.path, record.bytes_written,
+                                 record.encode_seconds * 1000)
+                    # 完成一项立即记入清单，中途中断后重跑从这里继续
+                    src_hash = src_hashes.get((file, variant))
+                    if manifest is not None and src_hash is not None:
+                        manifest.record(file, variant, src_hash, cfg_hash, record.path, record.bytes_written)
+                if progress_callback:
+                    progress_callback(done, file, record, error)
+        finally:
+            clear_shared_decode_cache()
+            if manifest is not None:
+                manifest.compact()
+                manifest.close()
+        return failures
+
+    def _run_batches(self, items, config: ImageProcessConfig, plan=None, collect_metrics: bool = False):
+        """
+        同尺寸分组批处理：每个批次是执行器的一个任务，结果展开为逐项
+        分组键用扫描时记下的宽高和格式；不在登记表中的文件只读一次文件头，同一文件的多个变体共用
+        """
+        from src.pipeline.batch4d import group_by_shape
+        from src.pipeline.executor import make_executor
+        from src.pipeline.scanner import read_header
+
+        headers = {}
+
+        def shape_key(item):
+            file = item[0]
+            if file not in headers:
+                info = self.files.info_of(file) or read_header(file)
+                headers[file] = (info.width, info.height, info.format) if info else None
+            return headers[file]
+
+        batches = [members for _, members in group_by_shape(items, shape_key, config.batch_size)]
+        executor = make_executor(config.executor if config.executor != "stream" else "thread", config.workers)
+        task = partial(process_batch_files, output_dir=self.output_dir, config=config, plan=plan,
+                       collect_metrics=collect_metrics)
+        for (batch, _), results, error in executor.run(task, stamped(batches)):
+            if error is not None:
+                for item in batch:
+                    yield item, None, error
+            else:
+                yield from results
+
+
+    def _run_per_source(self, executor, items, config: ImageProcessConfig, plan=None, collect_metrics: bool = False):
+        """
+        进程池：解码缓存每个进程一份，同一源图的变体分到不同进程会各解码一次
+        因此把同一源图的全部变体作为一个任务交给同一个进程，结果展开为逐项
+        """
+        groups = [list(group) for _, group in itertools.groupby(items, key=lambda it: it[0])]
+        task = partial(process_source_variants, output_dir=self.output_dir, config=config, plan=plan,
+                       collect_metrics=collect_metrics)
+        for (group, _), results, error in executor.run(task, stamped(groups)):
+            if error is not None:
+                for item in group:
+                    yield item, None, error
+            else:
+                yield from results
+
+
+# 同一源图的多个变体共享一次解码（每个进程一份，第一次使用时创建，每批结束时清空）
+_decode_cache = None
+_decode_cache_lock = threading.Lock()
+
+
+def shared_decode_cache():
+    global _decode_cache
+    with _decode_cache_lock:
+        if _decode_cache is None:
+            from src.pipeline.decoder import SharedDecodeCache
+            _decode_cache = SharedDecodeCache()
+        return _decode_cache
+
+
+def clear_shared_decode_cache():
+    """释放缓存的整图解码结果；进程池的 worker 随进程池结束，无需清理"""
+    with _decode_cache_lock:
+        if _decode_cache is not None:
+            _decode_cache.clear()
+
+
+def variant_items(files, variants: int):
+    """
+    展开为 (文件, 变体序号) 列表；同一文件的变体相邻，便于共享解码
+    只生成一个输出时变体序号为 0，文件名不加后缀
+    """
+    if variants <= 1:
+        return [(f, 0) for f in files]
+    return [(f, k) for f in files for k in range(1, variants + 1)]
+
+
+def load_source(file, config: ImageProcessConfig, shared: bool = False):
+    """解码源图；shared=True 时经由共享缓存，供多个变体复用"""
+    from src.ImageBatchProcessor_utils import decode_image
+
+    if not shared:
+        return decode_image(file, config)
+    # 键带上修改时间和大小：同一会话内源图被改写后重跑，不会取到旧像素
+    st = os.stat(file)
+    key = (os.fspath(file), st.st_mtime_ns, st.st_size, config.scale_x, config.scale_y)
+    return shared_decode_cache().get(key, lambda: decode_image(file, config))
+
+
+def new_metrics(file, submitted=None) -> ImageMetrics:
+    """开始记录一张图：源文件字节数和（执行器中的）排队等待"""
+    metrics = ImageMetrics(file=os.fspath(file))
+    try:
+        metrics.bytes_in = os.path.getsize(file)
+    except OSError:
+        pass
+    if submitted is not None:
+        metrics.queue_wait = queue_wait_since(submitted)
+    return metrics
+
+
+def process_item(entry, output_dir, config: ImageProcessConfig, plan=None, collect_metrics: bool = False):
+    """执行器任务：entry 为 stamped() 产出的 ((文件, 变体序号[, 输出路径]), 提交时间)"""
+    (file, variant, *target), submitted = entry
+    metrics = new_metrics(file, submitted) if collect_metrics else None
+    return process_file(file, output_dir, config, variant, plan, metrics, *target)
+
+
+def process_source_variants(entry, output_dir, config: ImageProcessConfig, plan=None, collect_metrics: bool = False):
+    """
+    进程池任务：依次处理同一源图的全部变体，在本进程内共享一次解码
+    :param entry: stamped() 产出的 ([(文件, 变体序号, 输出路径), ...], 提交时间)
+    :return: [((文件, 变体序号, 输出路径), OutputRecord 或 None, 异常或 None)]
+    """
+    items, submitted = entry
+    results = []
+    for i, item in enumerate(items):
+        # 排队等待只算到第一个变体开始，之后的变体在本任务内顺序执行
+        stamp = submitted if i == 0 else time.time()
+        try:
+            results.append((item, process_item((item, stamp), output_dir, config, plan, collect_metrics), None))
+        except Exception as e:
+            results.append((item, None, e))
+    # 该源图的变体已全部完成，不必在本进程的缓存里继续占着整图
+    clear_shared_decode_cache()
+    return results
+
+
+def process_file(file, output_dir, config: ImageProcessConfig, variant: int = 0, plan=None, metrics=None,
+                 output_path=None):
+    """
+    处理单张图片并保存（模块级函数，便于进程池 pickle）
+    :param plan: 可选，已编译的 ExecutionPlan；不传时按 config 现场编译
+    :param metrics: 可选，ImageMetrics，记录各阶段耗时，随 OutputRecord 返回
+    :param output_path: 可选，预先分配的输出路径；不传时按命名模板分配
+    """
+    from src.ImageBatchProcessor_utils import transform_image
+
+    logger.debug("process_one file: %s", file)
+    if not output_dir or not os.path.isdir(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+    if metrics is not None and not metrics.file:
+        metrics = new_metrics(file)
+
+    with timed(metrics, "decode"):
+        img_np, canvas_size = load_source(file, config, shared=variant > 0)
+    with timed(metrics, "transform"):
+        img_np = transform_image(img_np, plan or config, canvas_size, metrics)
+    with timed(metrics, "encode"):
+        encoded = encode_output(img_np, config)
+    with timed(metrics, "write"):
+        return write_output(file, encoded, output_dir, config, variant, metrics, output_path)
+
+
+@dataclass
+class OutputRecord:
+    """单张图片的输出结果"""
+    path: str
+    bytes_written: int
+    encode_seconds: float
+    metrics: Optional[ImageMetrics] = None
+    # 运行清单中已完成、本次跳过
+    skipped: bool = False
+
+
+def encode_output(img_np, config: ImageProcessConfig) -> "EncodedImage":
+    """按配置的输出格式编码"""
+    from src.pipeline.encoder import encode_image
+
+    return encode_image(img_np, config.output_format, config.output_quality, config.compression_level)
+
+
+def allocate_output_path(file, output_dir, overwrite: bool, ext: str = ".png", variant: int = 0,
+                         template: str = None) -> str:
+    """
+    按命名模板（默认 mod_{name}{variant}）为单张图分配输出路径；不允许覆盖时重名追加序号
+    每次调用新建分配器，不保留上一次的预留（允许覆盖时同名输出直接覆盖）；整批处理由 process_all 统一预分配
+    """
+    from src.pipeline.naming import DEFAULT_TEMPLATE, OutputNamer
+
+    return OutputNamer(output_dir, overwrite, template or DEFAULT_TEMPLATE).reserve(file, variant, ext)
+
+
+def write_output(file, encoded: "EncodedImage", output_dir, config: ImageProcessConfig, variant: int = 0,
+                 metrics=None, output_path=None) -> OutputRecord:
+    """:param output_path: 可选，预先分配的输出路径；扩展名与编码结果不符时以编码结果为准"""
+    if output_path is None or not output_path.endswith(encoded.ext):
+        output_path = allocate_output_path(file, output_dir, config.overwrite, encoded.ext, variant,
+                                           config.name_template)
+    logger.debug("output_path: %s", output_path)
+    with open(output_path, "wb") as f:
+        f.write(encoded.data)
+    if metrics is not None:
+        metrics.bytes_out = encoded.nbytes
+    return OutputRecord(output_path, encoded.nbytes, encoded.encode_seconds, metrics)
+
+
+def process_batch_files(entry, output_dir, config: ImageProcessConfig, plan=None, collect_metrics: bool = False):
+    """
+    处理一批原图尺寸相同的 (文件, 变体序号)
+    同一文件的多个变体只解码一次，在批内叠成多份独立随机处理
+    整批变换的耗时平均分摊到批内每张图
+    :param entry: stamped() 产出的 ([(文件, 变体序号[, 输出路径]), ...], 提交时间)
+    :return: [((文件, 变体序号), OutputRecord 或 None, 异常或 None)]
+    """
+    from src.ImageBatchProcessor_utils import transform_batch
+    from src.pipeline.batch4d import group_by_shape
+
+    items, submitted = entry
+    decoded, results = [], []
+    for item in items:
+        file, variant = item[:2]
+        metrics = new_metrics(file, submitted) if collect_metrics else None
+        try:
+            with timed(metrics, "decode"):
+                img_np, canvas_size = load_source(file, config, shared=variant > 0)
+            decoded.append((item, img_np, canvas_size, metrics))
+        except Exception as e:
+            results.append((item, None, e))
+    # 降采样解码后的尺寸也可能不同（如 PNG 与 JPEG 混在同一组），按实际数组尺寸和画布再分一次
+    for (_, canvas_size), members in group_by_shape(decoded, lambda d: (d[1].shape, d[2]), len(decoded) or 1):
+        start = time.perf_counter()
+        stack = transform_batch([img for _, img, _, _ in members], plan or config, canvas_size)
+        share = (time.perf_counter() - start) / len(members)
+        for (item, _, _, metrics), img_np in zip(members, stack):
+            file, variant, *target = item
+            try:
+                if metrics is not None:
+                    metrics.add("transform", share)
+                with timed(metrics, "encode"):
+                    encoded = encode_output(img_np, config)
+                with timed(metrics, "write"):
+                    record = write_output(file, encoded, output_dir, config, variant, metrics, *target)
+                results.append((item, record, None))
+            except Exception as e:
+                results.append((item, None, e))
+    return results
+
+
+def build_stream_pipeline(output_dir, config: ImageProcessConfig, queue_size: int = 4, plan=None,
+                          collect_metrics: bool = False) -> StagedPipeline:
+    """
+    流式流水线：读盘解码 → 变换 → 编码 → 写盘
+    读写阶段各 2 个线程（主要在等 I/O），变换和编码按并行数分配
+    输入为 (文件, 变体序号[, 输出路径])，同一文件的变体共享解码
+    collect_metrics 时 ImageMetrics 随数据在各阶段间传递，阶段之间的排队时间累加到 queue_wait
+    """
+    from src.ImageBatchProcessor_utils import transform_image
+    from src.pipeline.executor import resolve_workers
+    from src.pipeline.plan import compile_plan
+
+    workers = resolve_workers(config.workers)
+    plan = plan or compile_plan(config)
+    # 解码前的排队时间在 ImageMetrics 创建之前发生，先按项暂存
+    waits, lock = {}, threading.Lock()
+
+    def on_wait(item, stage, seconds):
+        with lock:
+            waits[item] = waits.get(item, 0.0) + seconds
+
+    def decode(item):
+        metrics = new_metrics(item[0]) if collect_metrics else None
+        with timed(metrics, "decode"):
+            img_np, canvas_size = load_source(item[0], config, shared=item[1] > 0)
+        return item, img_np, canvas_size, metrics
+
+    def transform(v):
+        item, img_np, canvas_size, metrics = v
+        with timed(metrics, "transform"):
+            return item, transform_image(img_np, plan, canvas_size, metrics), metrics
+
+    def encode(v):
+        item, img_np, metrics = v
+        with timed(metrics, "encode"):
+            return item, encode_output(img_np, config), metrics
+
+    def write(v):
+        item, encoded, metrics = v
+        file, variant, *target = item
+        with timed(metrics, "write"):
+            record = write_output(file, encoded, output_dir, config, variant, metrics, *target)
+        if metrics is not None:
+            with lock:
+                metrics.queue_wait += waits.pop(item, 0.0)
+        return record
+
+    return StagedPipeline([
+        Stage("decode", decode, 2),
+        Stage("transform", transform, workers),
+        Stage("encode", encode, max(1, workers // 2)),
+        Stage("write", write, 2),
+    ], queue_size=queue_size, on_wait=on_wait if collect_metrics else None)
+
+
+def run_stream_pipeline(pipeline: StagedPipeline, items, workers: int = 0):
+    """
+    运行流式流水线；变换 / 编码阶段各有多个线程，与 ThreadExecutor 一样
+    运行期间按并行数平分 OpenCV 内部线程（进程级设置），结束后恢复
+    """
+    import cv2
+    from src.pipeline.executor import cv2_threads_per_worker, resolve_workers
 
-        img_out = process_image_v5(file, config)
-        print('img_out: ', img_out)
-        name, _ = os.path.splitext(os.path.basename(file))
-        output_path = os.path.join(self.output_dir, f"mod_{name}.png")
-        print('output_path: ', output_path)
-
-        # 如果不允许覆盖，自动重命名
-        if not config.overwrite:
-            counter = 1
-            while os.path.exists(output_path):
-                print('output_path: ', output_path)
-                output_path = os.path.join(self.output_dir, f"mod_{name}_{counter}.png")
-                counter += 1
-
-        img_out.save(output_path, format="PNG")
-        return output_path
+    prev = cv2.getNumThreads()
+    cv2.setNumThreads(cv2_threads_per_worker(resolve_workers(workers)))
+    try:
+        yield from pipeline.run(items)
+    finally:
+        cv2.setNumThreads(prev)
@@ -7,10 +7,13 @@
 # 4. 🔄 简化：构造函数，移除重复的信号连接
 # 5. ✅ 保持：所有传统图像处理功能
 
+import threading
+import time
 from pathlib import Path
 from PyQt6.QtCore import QThread, pyqtSignal
 from PyQt6.QtWidgets import QMessageBox,QApplication
 from PyQt6.QtCore import QTimer
+from src.pipeline.metrics import RollingSummary
 # ❌ 移除：ComfyUI相关的import
 # from src.comfyui_api.submit_worker import ComfySubmitWorker
 # from src.comfyui_api.workflow_manager import WorkflowManager
@@ -20,18 +23,76 @@ from PyQt6.QtCore import QTimer
 class Worker(QThread):
     """🔄 保持原有Worker类，专门处理传统图像处理"""
     progress = pyqtSignal(int)
+    # 每张图的 ImageMetrics，以及最近若干张的滚动汇总文本
+    image_metrics = pyqtSignal(object)
+    summary = pyqtSignal(str)
+    # 整批中止时的错误信息（单张失败不在此列）
+    error = pyqtSignal(str)
     finished = pyqtSignal()
 
     def __init__(self, model, config):
         super().__init__()
         self.model = model
         self.config = config
+        # 运行清单中已完成而跳过的数量、失败数量，finished 之后由界面读取
+        self.skipped = 0
+        self.failed = 0
 
     def run(self):
-        for i, file in enumerate(self.model.files, start=1):
-            self.model.process_one(file, self.config)
-            self.progress.emit(i)
-        self.finished.emit()
+        # 由模型内的执行器并行处理，进度和耗时统计按完成顺序回报
+        rolling = RollingSummary()
+
+        def on_progress(done, file, record, error):
+            self.progress.emit(done)
+            if error is not None:
+                self.failed += 1
+            elif record.skipped:
+                self.skipped += 1
+            if record is not None and record.metrics is not None:
+                rolling.add(record.metrics)
+                self.image_metrics.emit(record.metrics)
+                self.summary.emit(rolling.format())
+
+        # 无论成败都发出 finished，否则模态进度窗口关不掉
+        try:
+            self.model.process_all(self.config, on_progress, collect_metrics=True)
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            self.finished.emit()
+
+class ScanWorker(QThread):
+    """后台递归扫描拖入的文件 / 目录，按块把 ImageInfo 送回界面线程"""
+    found = pyqtSignal(list)
+    # 扩展名是图片但文件头无法识别的路径
+    rejected = pyqtSignal(list)
+    # 每块最多条数 / 最长间隔（秒），兼顾界面刷新及时和信号开销
+    CHUNK_SIZE = 200
+    CHUNK_INTERVAL = 0.1
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        from src.pipeline.scanner import iter_images
+
+        rejected = []
+        chunk, last = [], time.monotonic()
+        for info in iter_images(self.paths, stop=self._stop, rejected=rejected):
+            chunk.append(info)
+            if len(chunk) >= self.CHUNK_SIZE or time.monotonic() - last >= self.CHUNK_INTERVAL:
+                self.found.emit(chunk)
+                chunk, last = [], time.monotonic()
+        if chunk:
+            self.found.emit(chunk)
+        if rejected:
+            self.rejected.emit(rejected)
+
 
 class ImageBatchPresenter:
     """
@@ -43,33 +104,61 @@ class ImageBatchPresenter:
         self.model = model
         self.view = view
         self.worker = None
+        self.worker_error = None
         self.comfy_presenter = None
+        self.scanners = set()
 
         # 🔄 保持传统图像处理相关的信号连接
         view.files_dropped.connect(self.handle_files)
         view.output_folder_selected.connect(self.handle_output_folder_selected)
         view.process_requested.connect(self.handle_process)
         view.file_removed.connect(self.handle_remove_file)
+        view.files_removed.connect(self.handle_remove_indices)
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop_scanners)
  
     def set_comfy_presenter(self, presenter):
         self.comfy_presenter = presenter
     def handle_output_folder_selected(self, folder_path):
         self.model.set_output_dir(folder_path)
-        self.comfy_presenter.set_output_dir(folder_path)
+        # ComfyUI 页在主窗口显示后才创建，此前只记录在模型里
+        if self.comfy_presenter:
+            self.comfy_presenter.set_output_dir(folder_path)
     def handle_files(self, paths):
         """🔄 保持原有文件处理逻辑"""
-        files = self.model.add_files(paths)
-        for f in files:
-            if isinstance(f, Path):
-                f = f.as_posix()
-            self.view.add_file_item(f)
+        # 递归扫描放到后台线程，扫到一块就加入列表，网络盘上的大目录不卡界面
+        scanner = ScanWorker(paths)
+        scanner.found.connect(self.handle_scanned)
+        scanner.rejected.connect(self.handle_rejected)
+        scanner.finished.connect(lambda: self.scanners.discard(scanner))
+        self.scanners.add(scanner)
+        scanner.start()
+
+    def stop_scanners(self):
+        """退出时停止仍在进行的扫描，避免线程未结束就被销毁"""
+        for scanner in list(self.scanners):
+            scanner.stop()
+            scanner.wait()
+
+    def handle_scanned(self, infos):
+        added = self.model.add_scanned(infos)
+        self.view.add_file_items([(Path(info.path).as_posix(), index, info) for index, info in added])
+
+    def handle_rejected(self, paths):
+        for path in paths:
+            print(f"⚠️ 无法识别的图片，已跳过: {path}")
 
     def handle_remove_file(self, filepath):
-        """🔄 保持原有文件移除逻辑，合并重复方法"""
+        """🔄 保持原有文件移除逻辑，合并重复方法；路径按规范化键匹配"""
         if filepath == "__CLEAR_ALL__":
             self.model.files.clear()
-        elif filepath in self.model.files:
-            self.model.files.remove(filepath)
+        else:
+            self.model.remove_files([filepath])
+
+    def handle_remove_indices(self, indices):
+        """界面批量删除：按加入时分配的序号删除"""
+        self.model.remove_indices(indices)
 
     def handle_process(self, config):
         """🔄 保持原有传统图像处理逻辑"""
@@ -80,21 +169,43 @@ class ImageBatchPresenter:
             QMessageBox.critical(self.view, "错误", "未选择输出目录")
             return
 
-        total_files = len(self.model.files)
-        self.view.show_progress_dialog(total_files)
+        from src.pipeline.plan import compile_plan
+
+        try:
+            compile_plan(config)
+        except ValueError as e:
+            QMessageBox.critical(self.view, "错误", f"参数不合法: {e}")
+            return
+
+        total_outputs = self.model.expected_outputs(config)
+        self.view.show_progress_dialog(total_outputs)
 
         self.worker = Worker(self.model, config)
         self.worker.progress.connect(self.view.progress_dialog.set_progress)
+        self.worker.summary.connect(self.view.progress_dialog.set_summary)
+        self.worker_error = None
+        self.worker.error.connect(self.on_process_error)
         self.worker.finished.connect(self.on_process_finished)
         self.worker.start()
 
+    def on_process_error(self, message):
+        self.worker_error = message
+
     def on_process_finished(self):
         """🔄 保持原有处理完成逻辑"""
         if self.view.progress_dialog:
             dlg = self.view.progress_dialog
             dlg.accept()
 
-        QMessageBox.information(self.view, "完成", "图片处理完成！")
+        if self.worker_error:
+            QMessageBox.critical(self.view, "错误", f"处理中止: {self.worker_error}")
+            return
+        message = "图片处理完成！"
+        if self.worker.skipped:
+            message += f"\n\n跳过已完成 {self.worker.skipped} 张（源图和参数都未变化）；取消勾选“跳过已完成”可全部重新处理"
+        if self.worker.failed:
+            message += f"\n\n失败 {self.worker.failed} 张"
+        QMessageBox.information(self.view, "完成", message)
         
     # ❌ 移除：handle_comfy_remote_process方法
     # 原因：ComfyUI相关逻辑已移至ComfyUIPresenter，避免职责混乱
@@ -1,115 +1,200 @@
 import cv2
 import numpy as np
-import random
 from PIL import Image
-from types import SimpleNamespace
-from dataclasses import asdict
 from src.config import ImageProcessConfig
 from pathlib import Path
+from src.pipeline.geometry import warp_once, remap_composed, resize_matrix, scale_fill_matrix
+from src.pipeline.decoder import decode_file
+from src.pipeline.displacement import elastic_displacement, coarse_grids
+from src.pipeline.grid_cache import base_grid
+from src.pipeline.pixel_ops import apply_pixel_ops
+from src.pipeline.noise_bank import noise_bank
+from src.pipeline.tiling import render_tiled
+from src.pipeline.fill import fast_blur_background, warped_blur_background, fill_padding
+from src.pipeline.batch4d import random_signed_uniform, stack_pixel_ops
+from src.pipeline.plan import as_plan
+from src.pipeline.metrics import timed
 # =========================
 # 图像处理函数 (结构优化版)
 # =========================
 def process_image_v5(image_path: Path, config: ImageProcessConfig) -> Image.Image:
     """
     根据配置参数对图像进行批量处理。
-    动态解析 dataclass 配置，避免手动解包参数。
+    读取 → transform_image → 返回 PIL Image
     """
-    # 将配置转为可点属性访问对象
-    p = SimpleNamespace(**asdict(config))
+    img_np, canvas_size = decode_image(image_path, config)
+    return Image.fromarray(transform_image(img_np, config, canvas_size))
 
-    # 读取图像
-    img = Image.open(image_path).convert("RGB")
-    img_np = np.array(img)
+def decode_image(image_path, config: ImageProcessConfig = None):
+    """
+    读取图像为 RGB uint8 数组（已按 EXIF 方向摆正）
+    传入 config 且内容会被缩小时，JPEG 直接降采样解码，后续几何变换再映射回原画布
+    :return: (数组, 输出画布尺寸 (w, h))
+    """
+    scale = 1.0
+    if config is not None:
+        scale = max(getattr(config, 'scale_x', 1.0), getattr(config, 'scale_y', 1.0))
+    return decode_file(image_path, scale=scale)
 
-    # Step 1: 水平翻转
-    if getattr(p, 'hflip', False):
-        img_np = cv2.flip(img_np, 1)
+def transform_image(img_np: np.ndarray, config, canvas_size=None, metrics=None) -> np.ndarray:
+    """
+    对已解码的 RGB 数组执行全部变换步骤
+    :param config: ImageProcessConfig 或已编译的 ExecutionPlan（批处理时每批只编译一次）
+    :param canvas_size: 输出画布 (w, h)，默认与输入相同；输入是降采样解码结果时传入原图尺寸
+    :param metrics: 可选，ImageMetrics，记录变换内部各步耗时
+    :return: uint8 数组（opacity < 1 时为 RGBA）
+    """
+    plan = as_plan(config)
+
+    # Step 1~4: 翻转 / 双区间随机旋转 / 轻微透视 / 缩放填充
+    # 先编译成一个 3x3 矩阵，只做一次重采样，避免多次插值带来的模糊和整帧拷贝
+    # 未启用的阶段不抽随机数，矩阵里也不出现
+    src_h, src_w = img_np.shape[:2]
+    w, h = canvas_size or (src_w, src_h)
+    angle = plan.draw_angle()
+    shift = plan.draw_shift()
+    up = resize_matrix(src_w, src_h, w, h) if (src_w, src_h) != (w, h) else None
+    M = plan.geometry(w, h, angle, shift)
+    if up is not None:
+        M = M @ up
+
+    # Step 5~6 参数: 微量噪点 + 颜色细微扰动 + 透明度
+    factor = plan.draw_factor()
+    tier = plan.tier
+
+    # 缩小时的边缘填充：reflect 由几何变换的镜像边界直接得到，其余模式最后覆盖填充带
+    content_rect = None
+    bg_small = None
+    if plan.has("fill"):
+        content_rect = scale_fill_matrix(w, h, plan.scale_x, plan.scale_y)[1]
+        if content_rect == (0, 0, w, h):
+            content_rect = None
+        elif plan.fill_mode == 'blur':
+            M_bg = plan.geometry(w, h, angle, shift, with_scale=False)
+            if up is not None:
+                M_bg = M_bg @ up
+            with timed(metrics, "background"):
+                bg_small = warped_blur_background(img_np, M_bg, (w, h), factor)
+
+    if 0 < plan.tile_size < max(w, h):
+        # 分块模式：始终单次重采样，弹性位移只保留低分辨率控制网格
+        grids = coarse_grids((h, w), *plan.elastic[:2]) if plan.elastic else None
+        with timed(metrics, "tiled"):
+            img_np = render_tiled(img_np, M, (w, h), grids, plan.tile_size,
+                                  interpolation=tier.interpolation, border_mode=cv2.BORDER_REFLECT,
+                                  noise_level=plan.noise_level, factor=factor, opacity=plan.opacity,
+                                  fixed_point=tier.fixed_point_maps)
+        if content_rect is not None:
+            with timed(metrics, "fill"):
+                fill_padding(img_np, content_rect, plan.fill_mode, bg_small)
+        return img_np
+
+    if plan.elastic and plan.single_pass:
+        # 几何矩阵折叠进弹性位移场，整张图只采样一次
+        strength, smoothness, fast = plan.elastic
+        with timed(metrics, "elastic_field"):
+            dx, dy = elastic_displacement((h, w), strength, smoothness, fast=fast)
+        with timed(metrics, "resample"):
+            img_np = remap_composed(img_np, M, dx, dy, interpolation=tier.interpolation,
+                                    border_mode=cv2.BORDER_REFLECT, fixed_point=tier.fixed_point_maps)
+    else:
+        with timed(metrics, "resample"):
+            img_np = warp_once(img_np, M, (w, h), interpolation=tier.interpolation, border_mode=cv2.BORDER_REFLECT)
+        if plan.elastic:
+            with timed(metrics, "elastic"):
+                img_np = apply_elastic_distortion(img_np, *plan.elastic)
+
+    # Step 5~6: 微量噪点 + 颜色细微扰动（融合为一次 uint8 像素运算）
+    # 噪点从预生成的纹理库中随机拼取，避免每张图整帧采样高斯分布
+    if plan.has("noise") or factor != 1.0 or plan.has("opacity"):
+        with timed(metrics, "pixel_ops"):
+            noise = noise_bank.sample(img_np.shape, plan.noise_level) if plan.has("noise") else None
+            img_np = apply_pixel_ops(img_np, plan.noise_level, factor, plan.opacity, noise=noise)
+    if content_rect is not None:
+        with timed(metrics, "fill"):
+            fill_padding(img_np, content_rect, plan.fill_mode, bg_small)
+    return img_np
+
+def transform_batch(images, config, canvas_size=None) -> np.ndarray:
+    """
+    同尺寸图片的批量版本 transform_image
+    每张图的随机参数一次按数组采样；几何+弹性仍逐张重采样，但直接写入预分配的 N×H×W×3 数组，
+    噪点 / 颜色扰动 / 透明度对整批一次完成（翻转已合并在几何矩阵里）
+    批量模式下总是单次重采样
+    :param images: 形状相同的 RGB 数组列表
+    :param config: ImageProcessConfig 或已编译的 ExecutionPlan
+    :return: N×H×W×C uint8 数组
+    """
+    plan = as_plan(config)
+    tier = plan.tier
+    n = len(images)
+    src_h, src_w = images[0].shape[:2]
+    w, h = canvas_size or (src_w, src_h)
+
+    angles = random_signed_uniform(n, *plan.rotation) if plan.rotation else np.zeros(n)
+    shifts = np.random.uniform(*plan.perspective, n) if plan.perspective else np.zeros(n)
+    if plan.color_jitter:
+        factors = np.random.uniform(1 - plan.color_jitter, 1 + plan.color_jitter, n)
+    else:
+        factors = np.ones(n)
+
+    content_rect = None
+    if plan.has("fill"):
+        content_rect = scale_fill_matrix(w, h, plan.scale_x, plan.scale_y)[1]
+        if content_rect == (0, 0, w, h):
+            content_rect = None
+    up = resize_matrix(src_w, src_h, w, h) if (src_w, src_h) != (w, h) else np.eye(3)
+
+    stack = np.empty((n, h, w, 3), dtype=np.uint8)
+    backgrounds = []
+    for i, img in enumerate(images):
+        M = plan.geometry(w, h, angles[i], shifts[i]) @ up
+        if plan.elastic:
+            strength, smoothness, fast = plan.elastic
+            dx, dy = elastic_displacement((h, w), strength, smoothness, fast=fast)
+            remap_composed(img, M, dx, dy, interpolation=tier.interpolation,
+                           border_mode=cv2.BORDER_REFLECT, dst=stack[i], fixed_point=tier.fixed_point_maps)
+        else:
+            warp_once(img, M, (w, h), interpolation=tier.interpolation,
+                      border_mode=cv2.BORDER_REFLECT, dst=stack[i])
+        if content_rect is not None and plan.fill_mode == 'blur':
+            M_bg = plan.geometry(w, h, angles[i], shifts[i], with_scale=False) @ up
+            backgrounds.append(warped_blur_background(img, M_bg, (w, h), factors[i]))
+        else:
+            backgrounds.append(None)
 
-    # Step 2: 垂直翻转
-    if getattr(p, 'vflip', False):
-        img_np = cv2.flip(img_np, 0)
+    stack = stack_pixel_ops(stack, plan.noise_level, factors, plan.opacity)
+    if content_rect is not None:
+        for i in range(n):
+            fill_padding(stack[i], content_rect, plan.fill_mode, backgrounds[i])
+    return stack
 
-    # Step 3: 双区间随机旋转
-    h, w = img_np.shape[:2]
-    center = (w // 2, h // 2)
-    min_angle = getattr(p, 'rot_min', 0.5)
-    max_angle = getattr(p, 'rot_max', 1.5)
-    if random.random() < 0.5:
-        angle = random.uniform(-max_angle, -min_angle)
-    else:
-        angle = random.uniform(min_angle, max_angle)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-    img_np = cv2.warpAffine(img_np, M, (w, h), flags=cv2.INTER_LANCZOS4, borderMode=cv2.BORDER_REFLECT)
-
-    # Step 4: 轻微透视变化
-    persp_min = getattr(p, 'persp_min', 1.0)
-    persp_max = getattr(p, 'persp_max', 5.0)
-    shift = random.uniform(persp_min, persp_max)
-    pts1 = np.float32([[0, 0], [w, 0], [0, h], [w, h]])
-    pts2 = np.float32([[0 + shift, 0], [w + shift, 0], [0, h + shift], [w, h + shift]])
-    M_persp = cv2.getPerspectiveTransform(pts1, pts2)
-    img_np = cv2.warpPerspective(img_np, M_persp, (w, h), borderMode=cv2.BORDER_REFLECT)
-
-    # Step 5: 加入微量噪点
-    noise_level = getattr(p, 'noise_level', 2.0)
-    noise = np.random.normal(0, noise_level, img_np.shape).astype(np.int16)
-    img_np = np.clip(img_np.astype(np.int16) + noise, 0, 255).astype(np.uint8)
-
-    # Step 6: 颜色细微扰动
-    color_jitter = getattr(p, 'color_jitter', 0.02)
-    factor = random.uniform(1 - color_jitter, 1 + color_jitter)
-    img_np = np.clip(img_np * factor, 0, 255).astype(np.uint8)
-    
-    
-    distortion_strength =getattr(p, 'distortion_strength', 5)
-    distortion_smoothness =getattr(p, 'distortion_smoothness', 8)
-    if distortion_strength > 0:
-        img_np = apply_elastic_distortion(img_np, distortion_strength, distortion_smoothness)
-    
-    scale_x = getattr(p, 'scale_x', 1.0)
-    scale_y = getattr(p, 'scale_y', 1.0)
-    if scale_x != 1.0 or scale_y != 1.0:
-        img_np = scale_and_fill(img_np, scale_x, scale_y, mode='reflect')
-    
-    opacity = getattr(p, 'opacity', 1.0)
-    if opacity < 1.0:
-        # 转换为RGBA添加透明度
-        if img_np.shape[2] == 3:
-            img_np = cv2.cvtColor(img_np, cv2.COLOR_RGB2RGBA)
-        img_np[..., 3] = (img_np[..., 3].astype(np.float32) * opacity).astype(np.uint8)
-    # ✅ 返回 PIL Image
-    return Image.fromarray(img_np)
-
-def apply_elastic_distortion(image, distortion_strength=5, distortion_smoothness=8):
+def apply_elastic_distortion(image, distortion_strength=5, distortion_smoothness=8, fast=True):
     """
     对图像进行弹性形变处理
     :param image: 输入图像 (numpy array)
     :param distortion_strength: 形变强度 (alpha)
     :param distortion_smoothness: 形变平滑度 (sigma)
+    :param fast: 是否使用低分辨率位移场（False 为原始全分辨率路径，用于对比）
     :return: 扭曲后的图像
     """
-    random_state = np.random.RandomState(None)
     shape = image.shape[:2]
+    dx, dy = elastic_displacement(shape, distortion_strength, distortion_smoothness, fast=fast)
 
-    dx = (random_state.rand(*shape) * 2 - 1) * distortion_strength
-    dy = (random_state.rand(*shape) * 2 - 1) * distortion_strength
-
-    dx = cv2.GaussianBlur(dx, (17, 17), distortion_smoothness)
-    dy = cv2.GaussianBlur(dy, (17, 17), distortion_smoothness)
-
-    x, y = np.meshgrid(np.arange(shape[1]), np.arange(shape[0]))
-    map_x = (x + dx).astype(np.float32)
-    map_y = (y + dy).astype(np.float32)
+    # 基础网格按尺寸缓存，位移场是新分配的，直接原地叠加
+    x, y = base_grid(*shape)
+    map_x = np.add(dx, x, out=dx)
+    map_y = np.add(dy, y, out=dy)
 
     return cv2.remap(image, map_x, map_y, interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
 
-def scale_and_fill(img_np, scale_x=1.0, scale_y=1.0, mode='reflect'):
+def scale_and_fill(img_np, scale_x=1.0, scale_y=1.0, mode='reflect', interpolation=cv2.INTER_LANCZOS4):
     h, w = img_np.shape[:2]
     new_w = int(w * scale_x)
     new_h = int(h * scale_y)
 
     # 缩放图像
-    img_resized = cv2.resize(img_np, (new_w, new_h), interpolation=cv2.INTER_LANCZOS4)
+    img_resized = cv2.resize(img_np, (new_w, new_h), interpolation=interpolation)
 
     if new_w <= w and new_h <= h:
         # ====== 缩小情况：需要填充 ======
@@ -122,7 +207,8 @@ def scale_and_fill(img_np, scale_x=1.0, scale_y=1.0, mode='reflect'):
             canvas = cv2.copyMakeBorder(img_resized, pad_top, pad_bottom, pad_left, pad_right, 
                                         borderType=cv2.BORDER_REFLECT_101)
         elif mode == 'blur':
-            bg = cv2.GaussianBlur(img_np, (51, 51), 30)
+            # 在低分辨率上模糊再放大，观感与 GaussianBlur((51, 51), 30) 一致
+            bg = fast_blur_background(img_np)
             canvas = bg
             canvas[pad_top:pad_top+new_h, pad_left:pad_left+new_w] = img_resized
         else:
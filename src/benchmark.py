@@ -0,0 +1,251 @@
+# src/benchmark.py
+# 流水线基准测试 - 无界面运行，用合成图逐阶段计时并记录峰值内存，输出可跨提交对比的 JSON 报告
+#
+# 用法：
+#   python -m src.benchmark                         # 1 / 6 / 24 MP，各阶段重复 3 次
+#   python -m src.benchmark --sizes 1 6 --repeat 5 --out bench.json
+#   python -m src.benchmark --compare old.json      # 与之前的报告对比（比值 < 1 表示变快）
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from src.config import ImageProcessConfig
+from src.ImageBatchProcessor_utils import (
+    process_image_v5, transform_image, apply_elastic_distortion, scale_and_fill,
+)
+from src.pipeline.decoder import decode_file
+from src.pipeline.displacement import elastic_displacement
+from src.pipeline.encoder import encode_image
+from src.pipeline.fill import warped_blur_background
+from src.pipeline.geometry import warp_once, remap_composed
+from src.pipeline.noise_bank import noise_bank
+from src.pipeline.pixel_ops import apply_pixel_ops
+from src.pipeline.plan import compile_plan
+
+DEFAULT_SIZES = (1, 6, 24)
+REPORT_VERSION = 1
+
+
+def synthetic_image(megapixels: float, seed: int = 0) -> np.ndarray:
+    """
+    3:2 的合成 RGB 图：平滑渐变 + 抗锯齿色块 + 文字，
+    兼顾低频区域和锐利边缘，编码耗时接近真实照片
+    """
+    rs = np.random.RandomState(seed)
+    w = int(round((megapixels * 1e6 * 1.5) ** 0.5))
+    h = int(round(w / 1.5))
+    base = rs.randint(0, 256, (12, 18, 3)).astype(np.uint8)
+    img = cv2.resize(base, (w, h), interpolation=cv2.INTER_CUBIC)
+    unit = max(w, h) / 1000
+    for _ in range(200):
+        center = (int(rs.randint(w)), int(rs.randint(h)))
+        color = tuple(int(c) for c in rs.randint(0, 256, 3))
+        cv2.circle(img, center, int(rs.randint(5, 60) * unit), color, -1, cv2.LINE_AA)
+    for _ in range(30):
+        org = (int(rs.randint(w)), int(rs.randint(h)))
+        cv2.putText(img, "Sample 123", org, cv2.FONT_HERSHEY_SIMPLEX, unit, (0, 0, 0),
+                    max(1, int(unit * 2)), cv2.LINE_AA)
+    return img
+
+
+def measure(fn, repeat: int):
+    """
+    重复执行 fn()，返回 (每次耗时秒列表, 各次中最大的峰值新增内存字节)
+    峰值内存由 tracemalloc 统计 numpy / cv2 输出数组的分配，不含 OpenCV 内部临时缓冲
+    """
+    times, peak = [], 0
+    tracemalloc.start()
+    try:
+        for i in range(repeat):
+            random.seed(i)
+            np.random.seed(i)
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def stage_cases(img: np.ndarray, jpeg_path: str, png_path: str, config: ImageProcessConfig):
+    """
+    各阶段的基准用例 [(名称, 无参函数)]
+    输入数组预先准备好，只计各阶段本身的耗时；配置未启用弹性扭曲（扭曲强度为 0）时不含扭曲相关用例
+    """
+    h, w = img.shape[:2]
+    plan = compile_plan(config)
+    tier = plan.tier
+    M = plan.geometry(w, h, angle=1.0, shift=3.0)
+    M_bg = plan.geometry(w, h, angle=1.0, shift=3.0, with_scale=False)
+    warped = warp_once(img, M, (w, h), interpolation=tier.interpolation)
+
+    def pixel_ops():
+        noise = noise_bank.sample(warped.shape, config.noise_level)
+        apply_pixel_ops(warped, config.noise_level, 1.01, config.opacity, noise=noise)
+
+    cases = [
+        ("decode_jpeg", lambda: decode_file(jpeg_path)),
+        ("decode_png", lambda: decode_file(png_path)),
+        ("geometry_warp", lambda: warp_once(img, M, (w, h), interpolation=tier.interpolation)),
+    ]
+    if plan.elastic is not None:
+        strength, smoothness, fast = plan.elastic
+        dx, dy = elastic_displacement((h, w), strength, smoothness, fast=fast)
+
+        def remap_once():
+            remap_composed(img, M, dx.copy(), dy.copy(), interpolation=tier.interpolation,
+                           fixed_point=tier.fixed_point_maps)
+
+        cases += [
+            ("elastic_field", lambda: elastic_displacement((h, w), strength, smoothness, fast=fast)),
+            ("elastic_field_exact", lambda: elastic_displacement((h, w), strength, smoothness, fast=False)),
+            ("single_pass_remap", remap_once),
+            ("apply_elastic_distortion", lambda: apply_elastic_distortion(warped, strength, smoothness, fast=fast)),
+        ]
+    return cases + [
+        ("pixel_ops", pixel_ops),
+        ("blur_background", lambda: warped_blur_background(img, M_bg, (w, h))),
+        ("scale_and_fill_blur", lambda: scale_and_fill(img, 0.9, 0.9, mode="blur")),
+        ("encode_png", lambda: encode_image(warped, "png", compression_level=config.compression_level)),
+        ("encode_jpeg", lambda: encode_image(warped, "jpeg", quality=config.output_quality)),
+        ("transform_image", lambda: transform_image(img, plan)),
+        ("process_image_v5", lambda: process_image_v5(jpeg_path, config)),
+    ]
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, repeat: int = 3, config: ImageProcessConfig = None,
+                  stages=None, log=print):
+    """
+    :param sizes: 合成图尺寸（百万像素）
+    :param stages: 可选，只运行名称在其中的阶段
+    :return: 报告 dict（可直接 json.dump）
+    """
+    config = config or ImageProcessConfig()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mp in sizes:
+            img = synthetic_image(mp)
+            h, w = img.shape[:2]
+            jpeg_path = os.path.join(tmp, f"bench_{mp}.jpg")
+            png_path = os.path.join(tmp, f"bench_{mp}.png")
+            bgr = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+            cv2.imwrite(jpeg_path, bgr, [cv2.IMWRITE_JPEG_QUALITY, 92])
+            cv2.imwrite(png_path, bgr, [cv2.IMWRITE_PNG_COMPRESSION, 3])
+            log(f"== {mp} MP ({w}x{h}) ==")
+            for name, fn in stage_cases(img, jpeg_path, png_path, config):
+                if stages and name not in stages:
+                    continue
+                times, peak = measure(fn, repeat)
+                entry = {
+                    "megapixels": mp,
+                    "width": w,
+                    "height": h,
+                    "stage": name,
+                    "repeat": repeat,
+                    "min_ms": round(min(times) * 1000, 3),
+                    "median_ms": round(statistics.median(times) * 1000, 3),
+                    "mean_ms": round(statistics.fmean(times) * 1000, 3),
+                    "peak_mb": round(peak / 2 ** 20, 2),
+                }
+                results.append(entry)
+                log(f"  {name:<26} {entry['median_ms']:>10.1f} ms  peak {entry['peak_mb']:>8.1f} MB")
+    return {
+        "version": REPORT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "config": {k: getattr(config, k) for k in config.__dataclass_fields__},
+        "results": results,
+    }
+
+
+def environment_info() -> dict:
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "cpu_count": os.cpu_count(),
+        "cv2_threads": cv2.getNumThreads(),
+        "max_rss_mb": max_rss_mb(),
+    }
+
+
+def git_commit():
+    """当前提交；不在 git 仓库中时为 None"""
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def max_rss_mb():
+    """进程峰值常驻内存（含 OpenCV 内部分配）；Windows 上没有 resource 模块时为 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为 KB
+    return round(rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10, 1)
+
+
+def compare_reports(current: dict, baseline: dict):
+    """
+    按 (尺寸, 阶段) 对比中位耗时
+    :return: [(尺寸, 阶段, 旧 ms, 新 ms, 新/旧)]
+    """
+    old = {(r["megapixels"], r["stage"]): r for r in baseline.get("results", [])}
+    rows = []
+    for r in current["results"]:
+        prev = old.get((r["megapixels"], r["stage"]))
+        if prev and prev["median_ms"] > 0:
+            rows.append((r["megapixels"], r["stage"], prev["median_ms"], r["median_ms"],
+                         r["median_ms"] / prev["median_ms"]))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="图像流水线逐阶段基准测试")
+    parser.add_argument("--sizes", type=float, nargs="+", default=list(DEFAULT_SIZES), help="合成图尺寸（百万像素）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段重复次数")
+    parser.add_argument("--stages", nargs="+", help="只运行这些阶段")
+    parser.add_argument("--quality", default="final", help="画质档位 draft / balanced / final")
+    parser.add_argument("--out", default="benchmark_report.json", help="JSON 报告路径")
+    parser.add_argument("--compare", help="与之前的 JSON 报告对比")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) if float(s).is_integer() else s for s in args.sizes]
+    report = run_benchmark(sizes, args.repeat, ImageProcessConfig(quality=args.quality), args.stages)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"报告已写入 {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"对比 {args.compare} ({baseline.get('environment', {}).get('commit')})")
+        for mp, stage, old_ms, new_ms, ratio in compare_reports(report, baseline):
+            print(f"  {mp:>4} MP {stage:<26} {old_ms:>10.1f} → {new_ms:>10.1f} ms  x{ratio:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# src/cli.py
+# 无界面命令行批处理 - 不导入 PyQt / winreg，可在 Linux 渲染机上直接运行
+#
+# 用法：
+#   python -m src.cli "input/**/*.jpg" more_images/ -o output/ --workers 8
+#   python -m src.cli input/ -o output/ --config params.json --set quality=draft --set variants_per_image=3
+#   python -m src.cli input/ -o output/ --preset 平台A --presets-file presets.json
+#
+# --config 为 ImageProcessConfig 各字段的 JSON
+# 预设文件为 {"预设名": {字段: 值, ...}, ...}，即界面“预设 → 导出预设”保存的文件
+# 进度逐行输出到 stdout；警告（如无法识别的图片）输出到 stderr，-v 时再加上模型内部的调试日志
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+from src.config import ImageProcessConfig, config_from_dict
+from src.ImageBatchProcessor_model import ImageBatchModel
+from src.pipeline.metrics import RollingSummary
+from src.pipeline.plan import compile_plan
+
+DEFAULT_PRESETS_FILE = "presets.json"
+
+
+def expand_inputs(patterns):
+    """展开通配符（支持 ** 递归）；目录原样交给 ImageBatchModel.add_files（递归扫描）"""
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                print(f"⚠️ 没有匹配的文件: {pattern}", file=sys.stderr)
+            paths.extend(matches)
+        else:
+            paths.append(pattern)
+    return paths
+
+
+def load_config(config_path=None, preset=None, presets_file=None, overrides=()) -> ImageProcessConfig:
+    """
+    默认值 → --config JSON → --preset → --set key=value，后者覆盖前者
+    :raises ValueError: 预设不存在或 --set 格式不对
+    """
+    config = ImageProcessConfig()
+    if config_path:
+        with open(config_path, encoding="utf-8") as f:
+            config = config_from_dict(json.load(f), config)
+    if preset:
+        presets_file = presets_file or DEFAULT_PRESETS_FILE
+        with open(presets_file, encoding="utf-8") as f:
+            presets = json.load(f)
+        if preset not in presets:
+            raise ValueError(f"预设 {preset} 不存在，可选 {sorted(presets)}")
+        params = presets[preset]
+        # 兼容界面保存的格式：值本身是 JSON 字符串
+        if isinstance(params, str):
+            params = json.loads(params)
+        config = config_from_dict(params, config)
+    params = {}
+    for item in overrides:
+        key, sep, val = item.partition("=")
+        if not sep:
+            raise ValueError(f"--set 需要 key=value 格式: {item}")
+        if key.strip() not in ImageProcessConfig.__dataclass_fields__:
+            raise ValueError(f"未知参数: {key}")
+        params[key.strip()] = val.strip()
+    return config_from_dict(params, config)
+
+
+def configure_logging(verbose: bool = False):
+    """日志输出到 stderr，不与 stdout 的进度行混在一起；进程池 worker 的日志同样经由 logging"""
+    logging.basicConfig(level=logging.WARNING, format="%(message)s", stream=sys.stderr)
+    if verbose:
+        logging.getLogger("src").setLevel(logging.DEBUG)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="批量图片处理（无界面）")
+    parser.add_argument("inputs", nargs="+", help="输入文件、目录或通配符（如 'imgs/**/*.jpg'）")
+    parser.add_argument("-o", "--output", required=True, help="输出目录")
+    parser.add_argument("--config", help="参数 JSON 文件（与预设格式相同）")
+    parser.add_argument("--preset", help="预设名称")
+    parser.add_argument("--presets-file", help=f"预设 JSON 文件，默认 {DEFAULT_PRESETS_FILE}")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="覆盖单个参数，可重复")
+    parser.add_argument("-j", "--workers", type=int, help="并行数，0 表示全部 CPU 核心")
+    parser.add_argument("--executor", choices=("serial", "thread", "process", "stream"), help="并行方式")
+    parser.add_argument("--no-resume", action="store_true", help="忽略运行清单，全部重新处理")
+    parser.add_argument("-v", "--verbose", action="store_true", help="同时输出模型内部的逐步日志（stderr）")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        overrides = list(args.overrides)
+        if args.workers is not None:
+            overrides.append(f"workers={args.workers}")
+        if args.executor:
+            overrides.append(f"executor={args.executor}")
+        if args.no_resume:
+            overrides.append("resume=false")
+        config = load_config(args.config, args.preset, args.presets_file, overrides)
+        compile_plan(config)
+    except (OSError, ValueError) as e:
+        print(f"❌ 参数错误: {e}", file=sys.stderr)
+        return 2
+
+    configure_logging(args.verbose)
+    model = ImageBatchModel()
+    model.set_output_dir(os.path.abspath(args.output))
+    model.add_files(expand_inputs(args.inputs))
+    total = model.expected_outputs(config)
+    if not total:
+        print("❌ 没有可处理的图片", file=sys.stderr)
+        return 2
+    print(f"开始处理 {len(model.files)} 张图片，共 {total} 个输出 → {model.output_dir}", flush=True)
+
+    rolling = RollingSummary()
+    skipped = 0
+    start = time.perf_counter()
+
+    def on_progress(done, file, record, error):
+        nonlocal skipped
+        if error is not None:
+            print(f"[{done}/{total}] ❌ {file}: {error}", flush=True)
+            return
+        if record.skipped:
+            skipped += 1
+            if args.verbose:
+                print(f"[{done}/{total}] ⏭️ {file} → {record.path}（已完成）", flush=True)
+            return
+        rolling.add(record.metrics)
+        m = record.metrics
+        print(f"[{done}/{total}] {file} → {record.path} "
+              f"({m.busy * 1000:.0f} ms, {record.bytes_written / 1024:.0f} KB)", flush=True)
+
+    failures = model.process_all(config, on_progress, collect_metrics=True)
+
+    elapsed = time.perf_counter() - start
+    processed = total - skipped
+    print(f"完成 {total - len(failures)}/{total}（跳过已完成 {skipped}），失败 {len(failures)}，"
+          f"耗时 {elapsed:.1f} s（{processed / elapsed if elapsed > 0 else 0:.1f} 张/秒）")
+    if len(rolling):
+        print(rolling.format())
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
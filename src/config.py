@@ -1,4 +1,4 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, asdict
 @dataclass
 class GlobalConfig:
     """
@@ -66,6 +66,22 @@ class ImageProcessConfig:
         "label": "扭曲平滑度",
         "tooltip": "扭曲平滑程度，值越大越平滑"
     })
+    quality: str = field(default="final", metadata={
+        "label": "画质档位",
+        "tooltip": "draft 双线性+定点取样（最快）/ balanced 双三次 / final Lanczos4（原画质，最慢）"
+    })
+    fast_elastic: bool = field(default=True, metadata={
+        "label": "快速扭曲场",
+        "tooltip": "在低分辨率控制网格上生成扭曲场再放大，大图更快更省内存；取消勾选使用原始全分辨率算法"
+    })
+    single_pass_remap: bool = field(default=True, metadata={
+        "label": "单次重采样",
+        "tooltip": "把旋转/透视/缩放合并进扭曲位移场，只调用一次 remap；取消勾选则先变换再单独扭曲"
+    })
+    tile_size: int = field(default=0, metadata={
+        "label": "分块大小",
+        "tooltip": "超大图按块处理以限制内存（像素，如 1024），0 表示整图处理"
+    })
     scale_x: float = field(default=1.0, metadata={
         "label": "水平缩放",
         "tooltip": "水平方向缩放倍数"
@@ -74,9 +90,77 @@ class ImageProcessConfig:
         "label": "垂直缩放",
         "tooltip": "垂直方向缩放倍数"
     })
+    fill_mode: str = field(default="reflect", metadata={
+        "label": "缩小填充方式",
+        "tooltip": "缩小后边缘的填充方式：reflect 镜像 / blur 模糊背景 / white 白色"
+    })
+    output_format: str = field(default="png", metadata={
+        "label": "输出格式",
+        "tooltip": "png / webp（无损）/ jpeg"
+    })
+    output_quality: int = field(default=95, metadata={
+        "label": "JPEG质量",
+        "tooltip": "输出为 jpeg 时的质量 (1~100)"
+    })
+    compression_level: int = field(default=3, metadata={
+        "label": "PNG压缩级别",
+        "tooltip": "0~9，越小编码越快、文件越大"
+    })
+    executor: str = field(default="thread", metadata={
+        "label": "并行方式",
+        "tooltip": "serial 串行 / thread 线程池 / process 进程池 / stream 解码-变换-编码分阶段流水线"
+    })
+    workers: int = field(default=0, metadata={
+        "label": "并行数",
+        "tooltip": "同时处理的图片数量，0 表示使用全部 CPU 核心"
+    })
+    variants_per_image: int = field(default=1, metadata={
+        "label": "每张变体数",
+        "tooltip": "每张原图生成多少个不同的随机版本（只解码一次），文件名追加 _v1、_v2…"
+    })
+    batch_size: int = field(default=0, metadata={
+        "label": "同尺寸批大小",
+        "tooltip": "把相同尺寸的图片叠成一批处理，适合大量中小图片；0 或 1 表示逐张处理"
+    })
+    name_template: str = field(default="mod_{name}{variant}", metadata={
+        "label": "命名模板",
+        "tooltip": "输出文件名（不含扩展名），可用 {name} 源文件名 / {variant} 变体后缀 / {index} 变体序号 / {parent} 所在文件夹 / {date} 日期；重名时追加 _1、_2…"
+    })
     overwrite: bool = field(default=True, metadata={
     "label": "覆盖已存在文件",
     "tooltip": "若勾选，则处理结果会覆盖已有文件，否则自动重命名"
     })
+    resume: bool = field(default=True, metadata={
+        "label": "跳过已完成",
+        "tooltip": "按输出目录中的运行清单跳过源图和参数都未变化、输出仍存在的图片，中断后可续跑"
+    })
+    hash_content: bool = field(default=False, metadata={
+        "label": "按内容校验源图",
+        "tooltip": "判断源图是否变化时除大小和修改时间外再校验文件内容（需完整读取，较慢）"
+    })
     
     
+
+
+def parse_field_value(f, value):
+    """按字段类型转换预设 / 命令行中的值（字符串 "true"、"3" 等）"""
+    if not isinstance(value, str):
+        return f.type(value) if f.type in (int, float) and not isinstance(value, bool) else value
+    if f.type == bool:
+        return value.lower() in ("true", "1", "yes", "y")
+    if f.type in (int, float):
+        return f.type(value)
+    return value
+
+
+def config_from_dict(params: dict, base: ImageProcessConfig = None) -> ImageProcessConfig:
+    """
+    在 base（默认值）之上应用 dict 中的参数，格式与预设（asdict 的 JSON）相同
+    未知字段忽略，与界面加载预设的行为一致
+    """
+    known = {f.name: f for f in fields(ImageProcessConfig)}
+    values = asdict(base or ImageProcessConfig())
+    for key, val in params.items():
+        if key in known:
+            values[key] = parse_field_value(known[key], val)
+    return ImageProcessConfig(**values)
@@ -0,0 +1,109 @@
+# src/file_registry.py
+# 待处理文件登记表 - 保持加入顺序，按规范化路径建哈希索引，增删查均为 O(1)
+
+import os
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+def path_key(path) -> str:
+    """规范化路径键：绝对路径，Windows 下统一大小写和分隔符"""
+    return os.path.normcase(os.path.abspath(os.fspath(path)))
+
+
+class FileRegistry:
+    """
+    按加入顺序保存绝对路径字符串（比 Path 对象省内存），另建 {路径键: 序号} 索引
+    - 序号在加入时分配，删除其他文件不会改变；界面列表项记录该序号，按序号删除无需查找
+    - 删除只把对应槽位置空，clear() 时才整体重置（序号重新从 0 开始）
+    - 可同时记下扫描得到的文件头信息（ImageInfo：宽高、格式），处理时分组不必再读文件
+    可以像原来的 list 一样迭代、取长度、判断 in
+    """
+
+    def __init__(self, paths: Iterable = ()):
+        self._paths: List[Optional[str]] = []
+        self._infos: list = []
+        self._index = {}
+        self._count = 0
+        self.add_many(paths)
+
+    def add(self, path, info=None) -> Optional[int]:
+        """
+        加入一个文件，返回序号；已存在时返回 None
+        :param info: 可选，扫描得到的 ImageInfo
+        """
+        key = path_key(path)
+        if key in self._index:
+            return None
+        index = len(self._paths)
+        self._paths.append(os.path.abspath(os.fspath(path)))
+        self._infos.append(info)
+        self._index[key] = index
+        self._count += 1
+        return index
+
+    def add_many(self, paths: Iterable) -> List[Tuple[int, str]]:
+        """批量加入，跳过重复，返回新加入的 [(序号, 路径)]"""
+        added = []
+        for path in paths:
+            index = self.add(path)
+            if index is not None:
+                added.append((index, self._paths[index]))
+        return added
+
+    def remove(self, path) -> bool:
+        index = self._index.pop(path_key(path), None)
+        if index is None:
+            return False
+        self._paths[index] = None
+        self._infos[index] = None
+        self._count -= 1
+        return True
+
+    def remove_many(self, paths: Iterable) -> int:
+        """批量删除，返回实际删除的数量"""
+        return sum(1 for path in paths if self.remove(path))
+
+    def remove_indices(self, indices: Iterable[int]) -> int:
+        """按序号批量删除（界面列表项记录的序号），返回实际删除的数量"""
+        removed = 0
+        for index in indices:
+            path = self.path_at(index)
+            if path is not None and self.remove(path):
+                removed += 1
+        return removed
+
+    def index_of(self, path) -> Optional[int]:
+        return self._index.get(path_key(path))
+
+    def info_of(self, path):
+        """加入时记下的 ImageInfo；未记录或不在表中时为 None"""
+        index = self._index.get(path_key(path))
+        return None if index is None else self._infos[index]
+
+    def path_at(self, index: int) -> Optional[str]:
+        """序号对应的路径；已删除或越界时为 None"""
+        if 0 <= index < len(self._paths):
+            return self._paths[index]
+        return None
+
+    def clear(self):
+        self._paths = []
+        self._infos = []
+        self._index = {}
+        self._count = 0
+
+    def items(self) -> Iterator[Tuple[int, str]]:
+        """按加入顺序的 (序号, 路径)"""
+        return ((i, p) for i, p in enumerate(self._paths) if p is not None)
+
+    def __iter__(self) -> Iterator[str]:
+        return (p for p in self._paths if p is not None)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, path) -> bool:
+        return path_key(path) in self._index
+
+    def __repr__(self):
+        return f"FileRegistry({self._count} files)"
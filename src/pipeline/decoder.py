@@ -0,0 +1,159 @@
+# src/pipeline/decoder.py
+# 解码层 - 直接解码为连续的 RGB uint8 数组，支持 JPEG 降采样解码和 EXIF 方向
+
+import io
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+# cv2 的 JPEG DCT 域降采样解码标志
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+# EXIF 方向为 5~8 时宽高互换
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def read_bytes(path) -> np.ndarray:
+    """读取文件字节；np.fromfile 在 Windows 中文路径下也可用（cv2.imread 不行）"""
+    return np.fromfile(str(path), dtype=np.uint8)
+
+
+def probe(buf):
+    """
+    只解析文件头，不解码像素
+    :return: (按 EXIF 方向摆正后的宽, 高, 格式)
+    """
+    with Image.open(io.BytesIO(buf)) as img:
+        w, h = img.size
+        fmt = img.format
+        try:
+            orientation = img.getexif().get(0x0112, 1)
+        except Exception:
+            orientation = 1
+    if orientation in _TRANSPOSED_ORIENTATIONS:
+        w, h = h, w
+    return w, h, fmt
+
+
+def probe_file(path):
+    """只读文件头获取 (宽, 高, 格式)，失败返回 None"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(256 * 1024)
+        return probe(head)
+    except Exception:
+        return None
+
+
+def reduction_factor(size, scale: float = 1.0, max_side: int = 0) -> int:
+    """
+    根据所需分辨率选择 1/2/4/8 降采样倍数，保证解码结果不低于实际需要的分辨率
+    :param size: 原图 (w, h)
+    :param scale: 内容最终相对原图的缩放比例
+    :param max_side: 输出长边上限，0 表示不限
+    """
+    need = min(float(scale), 1.0)
+    if max_side and max_side > 0:
+        need = min(need, max_side / float(max(size)))
+    r = 1
+    for candidate in (2, 4, 8):
+        if need * candidate <= 1.0:
+            r = candidate
+    return r
+
+
+def _decode_pil(buf) -> np.ndarray:
+    with Image.open(io.BytesIO(buf)) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        return np.asarray(img)
+
+
+def decode_rgb(buf, reduce: int = 1, fmt: str = None) -> np.ndarray:
+    """
+    解码为 RGB uint8 数组
+    - 由 cv2.imdecode 直接写入 numpy 数组，EXIF 方向在解码时一并处理
+    - 只有 JPEG 使用降采样解码（DCT 域），其他格式 reduce 无效
+    - cv2 无法解码的格式退回 PIL
+    """
+    if fmt != "JPEG":
+        reduce = 1
+    img = cv2.imdecode(buf, _REDUCED_FLAGS.get(reduce, cv2.IMREAD_COLOR))
+    if img is None:
+        return _decode_pil(buf)
+    # BGR → RGB 原地完成，不额外分配
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
+
+
+def decode_file(path, scale: float = 1.0, max_side: int = 0):
+    """
+    读取并解码
+    :return: (RGB 数组, 原图摆正后的尺寸 (w, h))；数组可能是降采样后的尺寸
+    """
+    buf = read_bytes(path)
+    try:
+        w, h, fmt = probe(buf)
+    except Exception:
+        # PIL 无法识别文件头时按原尺寸解码
+        img = decode_rgb(buf)
+        return img, (img.shape[1], img.shape[0])
+    r = reduction_factor((w, h), scale, max_side)
+    return decode_rgb(buf, r, fmt), (w, h)
+
+
+class _PendingDecode:
+    def __init__(self):
+        self.ready = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SharedDecodeCache:
+    """
+    按键去重的解码缓存：同一源图的多个变体并行请求时只解码一次
+    缓存的数组设为只读，保证各变体之间互不影响；最多保留 max_entries 个源图
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """loader() -> (数组, 画布尺寸)"""
+        with self._lock:
+            entry = self._data.get(key)
+            owner = entry is None
+            if owner:
+                entry = _PendingDecode()
+                self._data[key] = entry
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+            else:
+                self._data.move_to_end(key)
+
+        if owner:
+            try:
+                img, canvas_size = loader()
+                img.setflags(write=False)
+                entry.value = (img, canvas_size)
+            except Exception as e:
+                entry.error = e
+                with self._lock:
+                    self._data.pop(key, None)
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait()
+        if entry.error is not None:
+            raise entry.error
+        return entry.value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,106 @@
+# src/pipeline/displacement.py
+# 位移场生成器 - 为弹性扭曲生成平滑的 dx/dy 位移图
+
+import math
+import cv2
+import numpy as np
+
+from src.pipeline.grid_cache import upsample_maps
+
+# 原实现使用固定 17x17 的高斯核
+ELASTIC_KSIZE = 17
+# 低分辨率场上额外做一次的模糊（单位：控制点）
+_COARSE_SIGMA = 1.0
+
+
+def _kernel_stats(smoothness: float):
+    """
+    返回原 17x17 高斯核的 (一维标准差, 模糊后场的幅值系数)
+    幅值系数 = sum(k²)，即 iid 噪声经可分离核模糊后标准差的缩放比例
+    """
+    k = cv2.getGaussianKernel(ELASTIC_KSIZE, smoothness).ravel()
+    idx = np.arange(ELASTIC_KSIZE) - ELASTIC_KSIZE // 2
+    spread = math.sqrt(float(np.sum(k * idx * idx)))
+    gain = float(np.sum(k * k))
+    return spread, gain
+
+
+def exact_displacement(shape, distortion_strength, distortion_smoothness, random_state=None):
+    """原始精确路径：全分辨率随机场 + 17x17 高斯模糊"""
+    rs = random_state or np.random.RandomState(None)
+    dx = (rs.rand(*shape) * 2 - 1) * distortion_strength
+    dy = (rs.rand(*shape) * 2 - 1) * distortion_strength
+    dx = cv2.GaussianBlur(dx, (ELASTIC_KSIZE, ELASTIC_KSIZE), distortion_smoothness)
+    dy = cv2.GaussianBlur(dy, (ELASTIC_KSIZE, ELASTIC_KSIZE), distortion_smoothness)
+    return dx.astype(np.float32), dy.astype(np.float32)
+
+
+def coarse_grids(shape, distortion_strength, distortion_smoothness, random_state=None):
+    """
+    在稀疏控制网格上采样平滑位移场 (gx, gy)
+    控制点间距取原高斯核的一维标准差，幅值按原实现的理论标准差归一化
+    """
+    rs = random_state or np.random.RandomState(None)
+    h, w = shape
+    spread, gain = _kernel_stats(distortion_smoothness)
+    step = max(spread, 1.0)
+    gh = max(int(math.ceil(h / step)) + 1, 2)
+    gw = max(int(math.ceil(w / step)) + 1, 2)
+    # 均匀分布 [-s, s] 的标准差为 s/√3
+    target_std = distortion_strength / math.sqrt(3.0) * gain
+
+    grids = []
+    for _ in range(2):
+        grid = rs.standard_normal((gh, gw)).astype(np.float32)
+        grid = cv2.GaussianBlur(grid, (0, 0), _COARSE_SIGMA)
+        std = float(grid.std())
+        if std > 0:
+            grid *= target_std / std
+        grids.append(grid)
+    return grids[0], grids[1]
+
+
+def sample_grid(grid, shape, x0=0, y0=0, tw=None, th=None):
+    """
+    从控制网格中双线性取出全分辨率位移图的一块 [y0:y0+th, x0:x0+tw]
+    坐标映射与 cv2.resize(INTER_LINEAR) 一致，因此分块结果与整图放大逐像素相同
+    """
+    h, w = shape
+    tw = w - x0 if tw is None else tw
+    th = h - y0 if th is None else th
+    map_x, map_y = upsample_maps(grid.shape, shape, x0, y0, tw, th)
+    return cv2.remap(grid, map_x, map_y, interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def coarse_displacement(shape, distortion_strength, distortion_smoothness, random_state=None):
+    """
+    低分辨率路径：在稀疏控制网格上采样平滑场，再双线性放大为 float32 位移图
+    在相同 distortion_smoothness 下观感与精确路径一致
+    """
+    h, w = shape
+    gx, gy = coarse_grids(shape, distortion_strength, distortion_smoothness, random_state)
+    return (cv2.resize(gx, (w, h), interpolation=cv2.INTER_LINEAR),
+            cv2.resize(gy, (w, h), interpolation=cv2.INTER_LINEAR))
+
+
+def rescaled_params(distortion_strength, distortion_smoothness, ratio: float):
+    """
+    在缩小 ratio 倍的图上观感等效的 (形变强度, 平滑度)
+    平滑尺度按 ratio 缩小；幅值按 ratio 缩小后，再按两种核的 sum(k²) 之比补偿
+    """
+    smoothness = max(distortion_smoothness * ratio, 0.3)
+    gain = _kernel_stats(distortion_smoothness)[1]
+    gain_small = _kernel_stats(smoothness)[1]
+    return distortion_strength * ratio * gain / gain_small, smoothness
+
+
+def elastic_displacement(shape, distortion_strength, distortion_smoothness, fast=True, random_state=None):
+    """
+    生成弹性扭曲位移场
+    :param shape: (h, w)
+    :param fast: True 使用低分辨率控制网格，False 使用原始精确路径（用于对比）
+    :return: (dx, dy) float32
+    """
+    if fast:
+        return coarse_displacement(shape, distortion_strength, distortion_smoothness, random_state)
+    return exact_displacement(shape, distortion_strength, distortion_smoothness, random_state)
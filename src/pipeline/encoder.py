@@ -0,0 +1,67 @@
+# src/pipeline/encoder.py
+# 输出编码器 - PNG / 无损 WebP / JPEG，统一用 cv2.imencode 编码并记录耗时和字节数
+
+import time
+from dataclasses import dataclass
+import cv2
+import numpy as np
+
+# 格式 → 文件扩展名
+OUTPUT_FORMATS = {
+    "png": ".png",
+    "webp": ".webp",
+    "jpeg": ".jpg",
+}
+
+
+@dataclass
+class EncodedImage:
+    """编码结果"""
+    data: bytes
+    ext: str
+    encode_seconds: float
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+
+
+def normalize_format(fmt: str) -> str:
+    fmt = (fmt or "png").lower().lstrip(".")
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {fmt}，可选 {tuple(OUTPUT_FORMATS)}")
+    return fmt
+
+
+def encode_params(fmt: str, quality: int = 95, compression_level: int = 3) -> list:
+    """
+    :param quality: JPEG 质量 1~100
+    :param compression_level: PNG 压缩级别 0~9，越小越快、文件越大
+    """
+    if fmt == "png":
+        return [cv2.IMWRITE_PNG_COMPRESSION, int(min(max(compression_level, 0), 9))]
+    if fmt == "webp":
+        # cv2 中 WebP 质量大于 100 即为无损
+        return [cv2.IMWRITE_WEBP_QUALITY, 101]
+    return [cv2.IMWRITE_JPEG_QUALITY, int(min(max(quality, 1), 100))]
+
+
+def encode_image(img_np: np.ndarray, fmt: str = "png", quality: int = 95,
+                 compression_level: int = 3) -> EncodedImage:
+    """
+    编码 RGB / RGBA uint8 数组
+    JPEG 不支持透明度，RGBA 输入会丢弃 alpha 通道
+    """
+    fmt = normalize_format(fmt)
+    start = time.perf_counter()
+    if img_np.ndim == 3 and img_np.shape[2] == 4:
+        code = cv2.COLOR_RGBA2BGR if fmt == "jpeg" else cv2.COLOR_RGBA2BGRA
+    else:
+        code = cv2.COLOR_RGB2BGR
+    bgr = cv2.cvtColor(img_np, code)
+    ok, buf = cv2.imencode(OUTPUT_FORMATS[fmt], bgr, encode_params(fmt, quality, compression_level))
+    if not ok:
+        raise RuntimeError(f"{fmt} 编码失败")
+    return EncodedImage(buf.tobytes(), OUTPUT_FORMATS[fmt], time.perf_counter() - start)
@@ -0,0 +1,126 @@
+# src/pipeline/executor.py
+# 批处理执行器 - 串行 / 线程池 / 进程池三种后端，统一按完成顺序回报结果
+
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import cv2
+import numpy as np
+
+EXECUTOR_KINDS = ("serial", "thread", "process")
+
+
+def resolve_workers(workers: int = 0) -> int:
+    """0 或负数表示自动：使用全部 CPU 核心"""
+    if workers and workers > 0:
+        return int(workers)
+    return os.cpu_count() or 1
+
+
+def cv2_threads_per_worker(workers: int) -> int:
+    """多个 worker 并行时平分 OpenCV 内部线程，避免超额订阅"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _init_process_worker(cv2_threads: int):
+    cv2.setNumThreads(cv2_threads)
+    # fork 出的子进程继承父进程的 numpy / OpenCV 随机状态（random 模块会自动重新播种，numpy 不会），
+    # 不重新播种则各 worker 抽到相同的旋转 / 透视 / 颜色 / 噪点
+    np.random.seed()
+    cv2.setRNGSeed(int.from_bytes(os.urandom(4), "little") & 0x7FFFFFFF)
+
+
+class BatchExecutor:
+    """
+    执行器基类
+    run(fn, items) 逐个产出 (item, result, error)，顺序为完成顺序；
+    同时在途的任务数不超过 max_in_flight，避免一次性解码整批图片
+    """
+    kind = "serial"
+
+    def __init__(self, workers: int = 0, max_in_flight: int = 0):
+        self.workers = resolve_workers(workers)
+        self.max_in_flight = max_in_flight if max_in_flight > 0 else self.workers * 2
+
+    def run(self, fn, items):
+        for item in items:
+            try:
+                yield item, fn(item), None
+            except Exception as e:
+                yield item, None, e
+
+
+class _PoolExecutor(BatchExecutor, ABC):
+    @abstractmethod
+    def _make_pool(self):
+        """返回 concurrent.futures 的执行器"""
+
+    def run(self, fn, items):
+        items = iter(items)
+        with self._make_pool() as pool:
+            pending = {}
+
+            def _fill():
+                while len(pending) < self.max_in_flight:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        return
+                    pending[pool.submit(fn, item)] = item
+
+            _fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    item = pending.pop(fut)
+                    error = fut.exception()
+                    yield item, (None if error else fut.result()), error
+                _fill()
+
+
+class ThreadExecutor(_PoolExecutor):
+    """线程池：OpenCV / PIL 的重计算会释放 GIL，线程即可并行"""
+    kind = "thread"
+
+    def _make_pool(self):
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def run(self, fn, items):
+        # cv2.setNumThreads 是进程级设置，运行期间按 worker 数平分，结束后恢复
+        prev = cv2.getNumThreads()
+        cv2.setNumThreads(cv2_threads_per_worker(self.workers))
+        try:
+            yield from super().run(fn, items)
+        finally:
+            cv2.setNumThreads(prev)
+
+
+class ProcessExecutor(_PoolExecutor):
+    """进程池：完全绕开 GIL；fn 和 item 必须可 pickle"""
+    kind = "process"
+
+    def _make_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_process_worker,
+            initargs=(cv2_threads_per_worker(self.workers),),
+        )
+
+
+class SerialExecutor(BatchExecutor):
+    kind = "serial"
+
+    def __init__(self, workers: int = 1, max_in_flight: int = 0):
+        super().__init__(1, 1)
+
+
+def make_executor(kind: str = "thread", workers: int = 0, max_in_flight: int = 0) -> BatchExecutor:
+    """按名称创建执行器；workers 为 1 时直接退化为串行"""
+    kind = (kind or "thread").lower()
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"未知的执行器类型: {kind}，可选 {EXECUTOR_KINDS}")
+    if kind == "serial" or resolve_workers(workers) == 1:
+        return SerialExecutor()
+    if kind == "process":
+        return ProcessExecutor(workers, max_in_flight)
+    return ThreadExecutor(workers, max_in_flight)
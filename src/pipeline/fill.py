@@ -0,0 +1,100 @@
+# src/pipeline/fill.py
+# 缩小填充 - 镜像 / 模糊背景 / 白色；模糊背景在低分辨率上生成，成本与镜像填充相当
+
+import math
+import cv2
+import numpy as np
+
+from src.pipeline.geometry import resize_matrix, warp_once
+from src.pipeline.pixel_ops import gain_lut
+
+FILL_MODES = ("reflect", "blur", "white")
+
+# 原实现的模糊背景参数：GaussianBlur((51, 51), 30)
+BLUR_KSIZE = 51
+BLUR_SIGMA = 30
+# 在 1/8 分辨率上做模糊
+BLUR_DOWNSCALE = 8
+
+
+def _effective_sigma(ksize: int = BLUR_KSIZE, sigma: float = BLUR_SIGMA) -> float:
+    """截断高斯核（51x51, sigma=30 接近方框核）的实际标准差"""
+    k = cv2.getGaussianKernel(ksize, sigma).ravel()
+    idx = np.arange(ksize) - ksize // 2
+    return math.sqrt(float(np.sum(k * idx * idx)))
+
+
+def small_blur(img_small, downscale: int = BLUR_DOWNSCALE):
+    """对已缩小 downscale 倍的图做等效模糊"""
+    return cv2.GaussianBlur(img_small, (0, 0), _effective_sigma() / downscale,
+                            borderType=cv2.BORDER_REFLECT_101)
+
+
+def fast_blur_background(img_np, downscale: int = BLUR_DOWNSCALE):
+    """
+    与 cv2.GaussianBlur(img, (51, 51), 30) 观感一致的模糊背景
+    先 INTER_AREA 缩小，在小图上模糊，再双线性放大回原尺寸
+    """
+    h, w = img_np.shape[:2]
+    sw, sh = max(1, w // downscale), max(1, h // downscale)
+    small = cv2.resize(img_np, (sw, sh), interpolation=cv2.INTER_AREA)
+    return cv2.resize(small_blur(small, downscale), (w, h), interpolation=cv2.INTER_LINEAR)
+
+
+def warped_blur_background(src, M, canvas_size, factor: float = 1.0, downscale: int = BLUR_DOWNSCALE):
+    """
+    流水线用的低分辨率模糊背景
+    原实现对“翻转/旋转/透视/扭曲后、缩放前”的整图做模糊；这里把源图先缩小，
+    在 1/downscale 画布上按不含缩放的几何矩阵 M 变换后再模糊，颜色增益也在小图上完成
+    :param M: 源图坐标 → 输出坐标（不含缩放填充）的 3x3 矩阵
+    :return: 低分辨率背景，交给 fill_padding 按填充带放大
+    """
+    w, h = canvas_size
+    src_h, src_w = src.shape[:2]
+    bw, bh = max(1, w // downscale), max(1, h // downscale)
+    ssw, ssh = max(1, src_w // downscale), max(1, src_h // downscale)
+    src_small = cv2.resize(src, (ssw, ssh), interpolation=cv2.INTER_AREA)
+    M_small = resize_matrix(w, h, bw, bh) @ M @ resize_matrix(ssw, ssh, src_w, src_h)
+    bg = warp_once(src_small, M_small, (bw, bh), interpolation=cv2.INTER_LINEAR,
+                   border_mode=cv2.BORDER_REFLECT)
+    bg = small_blur(bg[..., :3], downscale)
+    if factor != 1.0:
+        bg = cv2.LUT(bg, gain_lut(factor))
+    return bg
+
+
+def padding_strips(w: int, h: int, rect):
+    """内容区域 rect=(x, y, rw, rh) 之外的上、下、左、右四条填充带"""
+    x, y, rw, rh = rect
+    strips = [
+        (0, 0, w, y),
+        (0, y + rh, w, h - y - rh),
+        (0, y, x, rh),
+        (x + rw, y, w - x - rw, rh),
+    ]
+    return [s for s in strips if s[2] > 0 and s[3] > 0]
+
+
+def fill_padding(out, rect, mode: str, bg_small=None):
+    """
+    原地覆盖内容区域外的填充带（只写 RGB 通道，保留 alpha）
+    :param bg_small: blur 模式下的低分辨率模糊背景，按填充带逐块放大，不生成整帧背景
+    """
+    if mode == "reflect":
+        return out
+    h, w = out.shape[:2]
+    for sx, sy, sw, sh in padding_strips(w, h, rect):
+        region = out[sy:sy + sh, sx:sx + sw, :3]
+        if mode == "blur" and bg_small is not None:
+            bh, bw = bg_small.shape[:2]
+            fx, fy = bw / w, bh / h
+            # 输出像素 → 小背景像素（像素中心对齐），再平移到填充带起点
+            A = np.array([
+                [fx, 0.0, 0.5 * fx - 0.5 + sx * fx],
+                [0.0, fy, 0.5 * fy - 0.5 + sy * fy],
+            ], dtype=np.float64)
+            region[:] = cv2.warpAffine(bg_small, A, (sw, sh), flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                                       borderMode=cv2.BORDER_REPLICATE)
+        else:
+            region[:] = 255
+    return out
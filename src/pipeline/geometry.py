@@ -0,0 +1,151 @@
+# src/pipeline/geometry.py
+# 几何编译器 - 把翻转、旋转、透视、缩放合成为一个 3x3 矩阵，只重采样一次
+
+import cv2
+import numpy as np
+from src.pipeline.grid_cache import base_grid
+from src.pipeline.quality import remap_maps
+
+
+def flip_matrix(w: int, h: int, hflip: bool = False, vflip: bool = False) -> np.ndarray:
+    """与 cv2.flip 等价的 3x3 翻转矩阵"""
+    M = np.eye(3, dtype=np.float64)
+    if hflip:
+        M[0, 0] = -1.0
+        M[0, 2] = w - 1
+    if vflip:
+        M[1, 1] = -1.0
+        M[1, 2] = h - 1
+    return M
+
+
+def rotation_matrix(w: int, h: int, angle: float) -> np.ndarray:
+    """以图像中心旋转 angle 度（与原 Step 3 的 getRotationMatrix2D 一致）"""
+    M = np.eye(3, dtype=np.float64)
+    M[:2] = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    return M
+
+
+def perspective_matrix(w: int, h: int, shift: float) -> np.ndarray:
+    """轻微透视：右上/左下角沿 x/y 方向偏移 shift 像素"""
+    pts1 = np.float32([[0, 0], [w, 0], [0, h], [w, h]])
+    pts2 = np.float32([[0 + shift, 0], [w + shift, 0], [0, h + shift], [w, h + shift]])
+    return cv2.getPerspectiveTransform(pts1, pts2).astype(np.float64)
+
+
+def resize_matrix(src_w: int, src_h: int, dst_w: int, dst_h: int) -> np.ndarray:
+    """与 cv2.resize 相同像素中心约定的缩放矩阵（用于把降采样解码的图映射回原画布）"""
+    sx = dst_w / src_w
+    sy = dst_h / src_h
+    return np.array([
+        [sx, 0.0, 0.5 * sx - 0.5],
+        [0.0, sy, 0.5 * sy - 0.5],
+        [0.0, 0.0, 1.0],
+    ], dtype=np.float64)
+
+
+def _axis_scale(n: int, scale: float):
+    """
+    单轴缩放参数，与 scale_and_fill 保持同样的取整和居中规则
+    :return: (缩放后长度, 放入画布的偏移量)
+    """
+    new_n = int(n * scale)
+    if new_n <= n:
+        offset = (n - new_n) // 2
+    else:
+        offset = -((new_n - n) // 2)
+    return new_n, offset
+
+
+def scale_fill_matrix(w: int, h: int, scale_x: float = 1.0, scale_y: float = 1.0):
+    """
+    与 scale_and_fill 等价的缩放 + 居中矩阵
+    :return: (3x3 矩阵, 内容区域 (x, y, w, h)，已裁剪到画布内)
+    """
+    new_w, off_x = _axis_scale(w, scale_x)
+    new_h, off_y = _axis_scale(h, scale_y)
+    sx = new_w / w
+    sy = new_h / h
+    # cv2.resize 按像素中心对齐：x' = (x + 0.5) * s - 0.5
+    M = np.array([
+        [sx, 0.0, 0.5 * sx - 0.5 + off_x],
+        [0.0, sy, 0.5 * sy - 0.5 + off_y],
+        [0.0, 0.0, 1.0],
+    ], dtype=np.float64)
+    x0, y0 = max(off_x, 0), max(off_y, 0)
+    rect = (x0, y0, min(new_w, w - x0), min(new_h, h - y0))
+    return M, rect
+
+
+def compile_geometry(w: int, h: int, hflip=False, vflip=False, angle=0.0, shift=0.0,
+                     scale_x=1.0, scale_y=1.0) -> np.ndarray:
+    """
+    按原流水线顺序（翻转 → 旋转 → 透视 → 缩放填充）合成一个正向矩阵
+    :return: 源图坐标 → 输出坐标 的 3x3 矩阵
+    """
+    M = flip_matrix(w, h, hflip, vflip)
+    if angle:
+        M = rotation_matrix(w, h, angle) @ M
+    if shift:
+        M = perspective_matrix(w, h, shift) @ M
+    if scale_x != 1.0 or scale_y != 1.0:
+        M = scale_fill_matrix(w, h, scale_x, scale_y)[0] @ M
+    return M
+
+
+def is_affine(M: np.ndarray) -> bool:
+    return abs(M[2, 0]) < 1e-12 and abs(M[2, 1]) < 1e-12 and abs(M[2, 2] - 1.0) < 1e-12
+
+
+def warp_once(img_np, M, dsize=None, interpolation=cv2.INTER_LANCZOS4,
+              border_mode=cv2.BORDER_REFLECT, dst=None):
+    """
+    用合成后的矩阵对图像做一次重采样
+    纯仿射时走 warpAffine，恒等变换直接返回原图（给定 dst 时拷贝进去）
+    :param dst: 可选，预分配的输出数组
+    """
+    h, w = img_np.shape[:2]
+    dsize = dsize or (w, h)
+    if dsize == (w, h) and np.allclose(M, np.eye(3)):
+        if dst is None:
+            return img_np
+        dst[:] = img_np
+        return dst
+    if is_affine(M):
+        return cv2.warpAffine(img_np, M[:2], dsize, dst=dst, flags=interpolation, borderMode=border_mode)
+    return cv2.warpPerspective(img_np, M, dsize, dst=dst, flags=interpolation, borderMode=border_mode)
+
+
+def composed_maps(M, dx, dy, x0: int = 0, y0: int = 0):
+    """
+    生成单次重采样用的 CV_32FC2 取样图：输出像素 u 的取样位置为 M⁻¹(u + d(u))
+    :param dx, dy: 该区域的 float32 位移场（会被原地修改）
+    :param x0, y0: 区域在输出画布中的左上角（分块渲染时使用）
+    """
+    h, w = dx.shape
+    x, y = base_grid(h, w)
+    np.add(dx, x, out=dx)
+    np.add(dy, y, out=dy)
+    if x0:
+        dx += x0
+    if y0:
+        dy += y0
+    pts = cv2.merge([dx, dy])
+    M_inv = np.linalg.inv(M)
+    if is_affine(M_inv):
+        return cv2.transform(pts, M_inv[:2])
+    return cv2.perspectiveTransform(pts, M_inv)
+
+
+def remap_composed(img_np, M, dx, dy, interpolation=cv2.INTER_LANCZOS4,
+                   border_mode=cv2.BORDER_REFLECT, dst=None, fixed_point: bool = False):
+    """
+    单次重采样：把几何矩阵折叠进弹性位移场，只调用一次 cv2.remap
+    等价于先 warp 再做弹性扭曲
+    :param M: 源图坐标 → 输出坐标 的 3x3 矩阵
+    :param dx, dy: 输出尺寸的 float32 位移场（会被原地修改）
+    :param dst: 可选，预分配的输出数组
+    :param fixed_point: 取样图转为 CV_16SC2 定点格式后再 remap
+    """
+    map1, map2 = remap_maps(composed_maps(M, dx, dy), fixed_point)
+    return cv2.remap(img_np, map1, map2, dst=dst, interpolation=interpolation, borderMode=border_mode)
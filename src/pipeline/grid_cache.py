@@ -0,0 +1,119 @@
+# src/pipeline/grid_cache.py
+# 形状缓存 - 按 (h, w) 缓存只与尺寸有关的数据（基础坐标网格、分块放大取样图），避免每张图重复分配
+
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class ShapeCache:
+    """
+    有界 LRU 缓存，键为 (类别, h, w, ...)
+    同时限制条目数和总字节数，缓存的数组设为只读，防止被调用方原地修改
+    """
+
+    def __init__(self, max_entries: int = 16, max_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _nbytes(value) -> int:
+        if isinstance(value, np.ndarray):
+            return value.nbytes
+        if isinstance(value, (tuple, list)):
+            return sum(ShapeCache._nbytes(v) for v in value)
+        return 0
+
+    @staticmethod
+    def _freeze(value):
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+        elif isinstance(value, (tuple, list)):
+            for v in value:
+                ShapeCache._freeze(v)
+        return value
+
+    def get(self, key, factory):
+        """命中则返回缓存值，否则调用 factory() 生成并放入缓存"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        value = self._freeze(factory())
+        size = self._nbytes(value)
+        with self._lock:
+            if key not in self._data and size <= self.max_bytes:
+                self._data[key] = value
+                self._bytes += size
+                while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                    _, old = self._data.popitem(last=False)
+                    self._bytes -= self._nbytes(old)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+            }
+
+
+# 进程内共享的默认缓存
+shape_cache = ShapeCache()
+# 分块放大位移场用的取样坐标图：每块一组，块数多，单独缓存，避免挤掉整图的基础网格
+map_cache = ShapeCache(max_entries=64, max_bytes=256 * 1024 * 1024)
+
+
+def base_grid(h: int, w: int, cache: ShapeCache = None):
+    """
+    返回 float32 基础坐标网格 (x, y)，形状均为 (h, w)，只读
+    等价于 np.meshgrid(np.arange(w), np.arange(h))
+    """
+    cache = cache or shape_cache
+
+    def _build():
+        x = np.empty((h, w), dtype=np.float32)
+        y = np.empty((h, w), dtype=np.float32)
+        x[:] = np.arange(w, dtype=np.float32)
+        y[:] = np.arange(h, dtype=np.float32)[:, None]
+        return x, y
+
+    return cache.get(("base_grid", h, w), _build)
+
+
+def upsample_maps(grid_shape, shape, x0: int, y0: int, tw: int, th: int, cache: ShapeCache = None):
+    """
+    控制网格 → 全分辨率位移图一块 [y0:y0+th, x0:x0+tw] 的 float32 取样坐标 (map_x, map_y)，只读
+    坐标映射与 cv2.resize(INTER_LINEAR) 一致；只与尺寸和块位置有关，dx / dy 和同尺寸的后续图片共用
+    """
+    cache = cache or map_cache
+    gh, gw = grid_shape
+    h, w = shape
+
+    def _build():
+        xs = (np.arange(x0, x0 + tw, dtype=np.float32) + 0.5) * np.float32(gw / w) - 0.5
+        ys = (np.arange(y0, y0 + th, dtype=np.float32) + 0.5) * np.float32(gh / h) - 0.5
+        map_x = np.empty((th, tw), dtype=np.float32)
+        map_y = np.empty((th, tw), dtype=np.float32)
+        map_x[:] = xs
+        map_y[:] = ys[:, None]
+        return map_x, map_y
+
+    return cache.get(("upsample_maps", gh, gw, h, w, x0, y0, tw, th), _build)
@@ -0,0 +1,146 @@
+# src/pipeline/manifest.py
+# 运行清单 - 记录每个输出对应的源图指纹和参数指纹，重跑时跳过已完成且未变化的项
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict
+
+MANIFEST_NAME = ".ibp_manifest.jsonl"
+
+# 只影响执行方式、文件命名或输出数量，不影响单个输出内容的字段，不计入参数指纹
+# （变体数从 3 改为 5 时，已有的 _v1~_v3 仍然有效，只补生成 _v4、_v5）
+EXECUTION_FIELDS = ("executor", "workers", "batch_size", "overwrite", "name_template", "resume", "hash_content",
+                    "variants_per_image")
+
+
+def config_hash(config) -> str:
+    """参数指纹：除执行方式外的全部字段"""
+    params = {k: v for k, v in asdict(config).items() if k not in EXECUTION_FIELDS}
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def source_hash(path, content: bool = False) -> str:
+    """
+    源图指纹：路径 + 大小 + 修改时间；content=True 时再加上文件内容的 blake2b
+    :raises OSError: 文件不存在或无法读取
+    """
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+    if content:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+class RunManifest:
+    """
+    输出目录下的追加式 JSONL 清单，每完成一个输出追加一行并立即刷盘，
+    中途崩溃或关闭时最多丢失最后一行
+    加载后按 (源路径, 变体序号) 建立字典，判断是否已完成为 O(1)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._load()
+
+    @classmethod
+    def for_output_dir(cls, output_dir) -> "RunManifest":
+        return cls(os.path.join(output_dir, MANIFEST_NAME))
+
+    @staticmethod
+    def key(file, variant: int = 0):
+        return os.path.abspath(file), int(variant)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.entries[(entry["src"], entry["variant"])] = entry
+                    self._lines += 1
+                except (ValueError, KeyError):
+                    # 崩溃时写了一半的行
+                    continue
+
+    def is_done(self, file, variant: int, src_hash: str, cfg_hash: str) -> bool:
+        """同一源图、同一参数的输出已存在"""
+        entry = self.entries.get(self.key(file, variant))
+        return (entry is not None and entry["source"] == src_hash and entry["config"] == cfg_hash
+                and os.path.exists(entry["output"]))
+
+    def split(self, items, cfg_hash: str, content: bool = False):
+        """
+        把 (文件, 变体序号) 分成待处理和已完成两部分
+        每个源文件只计算一次指纹，多个变体共用（content=True 时不会重复读取整个文件）
+        :return: (待处理 [item], 已完成 [item], {item: 源图指纹})；无法读取的源文件留给处理阶段报错
+        """
+        pending, done, hashes = [], [], {}
+        file_hashes = {}
+        for item in items:
+            file, variant = item
+            if file not in file_hashes:
+                try:
+                    file_hashes[file] = source_hash(file, content)
+                except OSError:
+                    file_hashes[file] = None
+            src_hash = file_hashes[file]
+            if src_hash is None:
+                pending.append(item)
+                continue
+            hashes[item] = src_hash
+            if self.is_done(file, variant, src_hash, cfg_hash):
+                done.append(item)
+            else:
+                pending.append(item)
+        return pending, done, hashes
+
+    def record(self, file, variant: int, src_hash: str, cfg_hash: str, output_path: str, nbytes: int = 0):
+        entry = {
+            "src": self.key(file, variant)[0],
+            "variant": int(variant),
+            "source": src_hash,
+            "config": cfg_hash,
+            "output": os.path.abspath(output_path),
+            "bytes": nbytes,
+            "time": round(time.time(), 3),
+        }
+        with self._lock:
+            self.entries[(entry["src"], entry["variant"])] = entry
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self._lines += 1
+
+    def compact(self):
+        """旧记录被覆盖太多时重写清单，只保留每项的最新一行"""
+        with self._lock:
+            if self._lines <= 2 * len(self.entries) + 100:
+                return
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            os.replace(tmp, self.path)
+            self._lines = len(self.entries)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,109 @@
+# src/pipeline/metrics.py
+# 热路径埋点 - 逐图记录解码 / 变换各步 / 编码 / 写盘耗时、读写字节数和排队等待，并给出滚动汇总
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+# 顶层阶段，其余名称记入 transform_stages（变换内部各步）
+PHASES = ("decode", "transform", "encode", "write")
+PHASE_LABELS = {"decode": "解码", "transform": "变换", "encode": "编码", "write": "写盘", "queue_wait": "排队"}
+
+
+@dataclass
+class ImageMetrics:
+    """单张图片的耗时（秒）与字节统计"""
+    file: str = ""
+    decode: float = 0.0
+    transform: float = 0.0
+    encode: float = 0.0
+    write: float = 0.0
+    queue_wait: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    transform_stages: dict = field(default_factory=dict)
+
+    def add(self, name: str, seconds: float):
+        if name in PHASES or name == "queue_wait":
+            setattr(self, name, getattr(self, name) + seconds)
+        else:
+            self.transform_stages[name] = self.transform_stages.get(name, 0.0) + seconds
+
+    @property
+    def busy(self) -> float:
+        """实际处理耗时（不含排队）"""
+        return self.decode + self.transform + self.encode + self.write
+
+
+@contextmanager
+def timed(metrics, name: str):
+    """metrics 为 None 时不计时"""
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+
+
+def stamped(items):
+    """
+    惰性地给每项打上提交时间 (item, time.time())
+    执行器只在有空位时才取下一项，因此开始执行时减去该时间即为排队等待
+    用 time.time() 以便跨进程比较
+    """
+    for item in items:
+        yield item, time.time()
+
+
+def queue_wait_since(submitted: float) -> float:
+    return max(0.0, time.time() - submitted)
+
+
+class RollingSummary:
+    """最近 window 张图的滚动平均，用于界面实时显示瓶颈"""
+
+    def __init__(self, window: int = 50):
+        self._items = deque(maxlen=window)
+        self._times = deque(maxlen=window)
+
+    def add(self, metrics: ImageMetrics):
+        self._items.append(metrics)
+        self._times.append(time.perf_counter())
+
+    def __len__(self):
+        return len(self._items)
+
+    def summary(self) -> dict:
+        """各阶段平均毫秒、平均字节、吞吐量（张/秒）和最慢阶段"""
+        n = len(self._items)
+        if not n:
+            return {}
+        avg = {name: sum(getattr(m, name) for m in self._items) / n * 1000
+               for name in PHASES + ("queue_wait",)}
+        stages = {}
+        for m in self._items:
+            for name, sec in m.transform_stages.items():
+                stages[name] = stages.get(name, 0.0) + sec * 1000 / n
+        span = self._times[-1] - self._times[0]
+        return {
+            "count": n,
+            "avg_ms": avg,
+            "transform_stages_ms": stages,
+            "bytes_in": sum(m.bytes_in for m in self._items) / n,
+            "bytes_out": sum(m.bytes_out for m in self._items) / n,
+            "images_per_sec": (n - 1) / span if span > 0 else 0.0,
+            "bottleneck": max(PHASES, key=lambda name: avg[name]),
+        }
+
+    def format(self) -> str:
+        s = self.summary()
+        if not s:
+            return ""
+        parts = [f"{PHASE_LABELS[k]} {v:.0f}ms" for k, v in s["avg_ms"].items()]
+        return (f"最近 {s['count']} 张平均: " + " | ".join(parts)
+                + f"\n读 {s['bytes_in'] / 2 ** 20:.1f}MB 写 {s['bytes_out'] / 2 ** 20:.1f}MB/张"
+                + f" | {s['images_per_sec']:.1f} 张/秒 | 瓶颈: {PHASE_LABELS[s['bottleneck']]}")
@@ -0,0 +1,123 @@
+# src/pipeline/naming.py
+# 输出命名 - 整批开始前列一次输出目录，之后在内存中按模板分配并预留文件名，不再逐个 os.path.exists 试探
+
+import os
+import string
+import threading
+from datetime import datetime
+
+DEFAULT_TEMPLATE = "mod_{name}{variant}"
+# 模板可用字段
+TEMPLATE_FIELDS = {
+    "name": "源文件名（不含扩展名）",
+    "variant": "变体后缀 _v1、_v2…，只生成一个输出时为空",
+    "index": "变体序号，只生成一个输出时为 0",
+    "parent": "源文件所在文件夹名",
+    "date": "处理日期 YYYYMMDD",
+}
+
+
+def validate_template(template: str):
+    """
+    :raises ValueError: 模板为空、含未知字段或路径分隔符
+    """
+    if not template or not template.strip():
+        raise ValueError("命名模板不能为空")
+    try:
+        names = [f for _, f, _, _ in string.Formatter().parse(template) if f is not None]
+    except ValueError as e:
+        raise ValueError(f"命名模板格式错误: {template} ({e})")
+    unknown = [f for f in names if f not in TEMPLATE_FIELDS]
+    if unknown:
+        raise ValueError(f"命名模板含未知字段 {unknown}，可用 {tuple(TEMPLATE_FIELDS)}")
+    if "/" in template or "\\" in template:
+        raise ValueError(f"命名模板不能包含路径分隔符: {template}")
+
+
+def render_template(template: str, file, variant: int = 0, date: str = None) -> str:
+    """按模板生成输出文件名主干（不含序号和扩展名）"""
+    path = os.fspath(file)
+    return template.format(
+        name=os.path.splitext(os.path.basename(path))[0],
+        variant=f"_v{variant}" if variant else "",
+        index=variant,
+        parent=os.path.basename(os.path.dirname(path)),
+        date=date or datetime.now().strftime("%Y%m%d"),
+    )
+
+
+class OutputNamer:
+    """
+    输出文件名分配器
+    - 创建时列一次输出目录（只在不覆盖时需要），之后只查内存中的集合
+    - 同一批内已分配的名字全部预留：即使允许覆盖，同名源图（如不同子目录下的 a.jpg）也不会互相覆盖
+    - 冲突时追加 _1、_2…，每个主干记住下一个序号，分配为均摊 O(1)
+    - 加锁，线程池 / 流水线的多个写盘线程可共用
+    :param template: 格式字符串（字段见 TEMPLATE_FIELDS），或可调用对象 (文件, 变体序号) -> 文件名主干
+    """
+
+    def __init__(self, output_dir, overwrite: bool = False, template=DEFAULT_TEMPLATE):
+        if isinstance(template, str):
+            validate_template(template)
+        self.output_dir = os.fspath(output_dir)
+        self.overwrite = overwrite
+        self.template = template
+        self._date = datetime.now().strftime("%Y%m%d")
+        self._existing = set() if overwrite else self._snapshot()
+        self._reserved = set()
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def _snapshot(self):
+        names = set()
+        try:
+            with os.scandir(self.output_dir) as it:
+                for entry in it:
+                    names.add(os.path.normcase(entry.name))
+        except OSError:
+            pass
+        return names
+
+    def stem(self, file, variant: int = 0) -> str:
+        if callable(self.template):
+            return self.template(file, variant)
+        return render_template(self.template, file, variant, self._date)
+
+    def _taken(self, key: str) -> bool:
+        return key in self._reserved or key in self._existing
+
+    def reserve(self, file, variant: int = 0, ext: str = ".png") -> str:
+        """分配并预留一个输出路径"""
+        stem = self.stem(file, variant)
+        with self._lock:
+            name = stem + ext
+            key = os.path.normcase(name)
+            if self._taken(key):
+                base = os.path.normcase(stem) + ext
+                counter = self._next.get(base, 1)
+                while True:
+                    name = f"{stem}_{counter}{ext}"
+                    key = os.path.normcase(name)
+                    counter += 1
+                    if not self._taken(key):
+                        break
+                self._next[base] = counter
+            self._reserved.add(key)
+        return os.path.join(self.output_dir, name)
+
+    def claim(self, path) -> bool:
+        """
+        预留一个已占用的输出（如运行清单中已完成、本次跳过的输出），之后分配的名字会避开它
+        :return: 路径不在输出目录下时为 False
+        """
+        path = os.path.abspath(os.fspath(path))
+        if os.path.normcase(os.path.dirname(path)) != os.path.normcase(os.path.abspath(self.output_dir)):
+            return False
+        with self._lock:
+            self._reserved.add(os.path.normcase(os.path.basename(path)))
+        return True
+
+    def reserve_all(self, items, ext: str = ".png") -> dict:
+        """按顺序为 (文件, 变体序号) 分配路径，结果与执行器的完成顺序无关"""
+        return {item: self.reserve(item[0], item[1], ext) for item in items}
+
@@ -0,0 +1,88 @@
+# src/pipeline/noise_bank.py
+# 噪点纹理库 - 每个噪声强度预生成几张 int8 噪点贴图，按随机偏移/翻转拼出整帧噪点
+
+import random
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from src.pipeline.pixel_ops import gaussian_noise_int8
+
+# 翻转方式：(行步长, 列步长)
+_FLIPS = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+
+
+class NoiseBank:
+    """
+    噪点纹理库
+    - 每个噪声强度生成 tiles_per_level 张 tile_size x tile_size 的 int8 贴图
+    - 每张图随机选择整体相位（滚动偏移），每个贴图块再随机选择贴图和翻转方式，
+      因此不同输出的逐像素噪点不同，而生成成本只是内存拷贝
+    - 按强度做 LRU，总内存不超过 max_bytes
+    噪点按 (h, w*c) 的单通道视图填充，各通道之间同样互不相关
+    """
+
+    def __init__(self, tile_size: int = 1024, tiles_per_level: int = 4,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.tile_size = tile_size
+        self.tiles_per_level = tiles_per_level
+        self.max_bytes = max_bytes
+        self._levels = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def level_bytes(self) -> int:
+        return self.tile_size * self.tile_size * self.tiles_per_level
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return len(self._levels) * self.level_bytes
+
+    def _tiles(self, noise_level: float):
+        key = round(float(noise_level), 3)
+        with self._lock:
+            tiles = self._levels.get(key)
+            if tiles is not None:
+                self._levels.move_to_end(key)
+                return tiles
+
+        s = self.tile_size
+        tiles = np.stack([gaussian_noise_int8((s, s), key) for _ in range(self.tiles_per_level)])
+        tiles.setflags(write=False)
+        max_levels = max(1, self.max_bytes // self.level_bytes)
+        with self._lock:
+            self._levels[key] = tiles
+            while len(self._levels) > max_levels:
+                self._levels.popitem(last=False)
+        return tiles
+
+    def sample(self, shape, noise_level: float) -> np.ndarray:
+        """返回与 shape 相同的 int8 噪点数组"""
+        tiles = self._tiles(noise_level)
+        h = shape[0]
+        row_len = int(np.prod(shape[1:]))
+        out = np.empty((h, row_len), dtype=np.int8)
+
+        s = self.tile_size
+        oy = random.randrange(s)
+        ox = random.randrange(s)
+        rolled = {}
+        for y in range(0, h, s):
+            bh = min(s, h - y)
+            for x in range(0, row_len, s):
+                bw = min(s, row_len - x)
+                idx = random.randrange(len(tiles))
+                if idx not in rolled:
+                    rolled[idx] = np.roll(tiles[idx], (oy, ox), axis=(0, 1))
+                fy, fx = random.choice(_FLIPS)
+                out[y:y + bh, x:x + bw] = rolled[idx][::fy, ::fx][:bh, :bw]
+        return out.reshape(shape)
+
+    def clear(self):
+        with self._lock:
+            self._levels.clear()
+
+
+# 进程内共享的默认噪点库
+noise_bank = NoiseBank()
@@ -0,0 +1,90 @@
+# src/pipeline/pixel_ops.py
+# 像素级融合算子 - 噪点、颜色扰动、透明度在 uint8 上一次完成，不产生 float64 / int16 整帧临时数组
+
+import math
+from functools import lru_cache
+import cv2
+import numpy as np
+
+
+def _norm_cdf(x: float) -> float:
+    return 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
+
+
+def _quantized_variance(sigma: float, offset: float) -> float:
+    """N(0, sigma) 量化为整数后的方差；offset=1 为向零截断，offset=0.5 为四舍五入"""
+    if sigma <= 0:
+        return 0.0
+    var = 0.0
+    k = 1
+    while True:
+        lo = (k - 1 + offset) / sigma
+        if lo > 8.0:
+            break
+        p = _norm_cdf((k + offset) / sigma) - _norm_cdf(lo)
+        var += 2.0 * k * k * p
+        k += 1
+    return var
+
+
+@lru_cache(maxsize=64)
+def equivalent_noise_sigma(noise_level: float) -> float:
+    """
+    原实现 np.random.normal(...).astype(np.int16) 是向零截断，
+    cv2.randn 写入整数数组时是四舍五入；这里求出使两者方差一致的 sigma
+    """
+    target = _quantized_variance(noise_level, 1.0)
+    if target <= 0:
+        return 0.0
+    lo, hi = 0.0, float(noise_level)
+    for _ in range(40):
+        mid = 0.5 * (lo + hi)
+        if _quantized_variance(mid, 0.5) < target:
+            lo = mid
+        else:
+            hi = mid
+    return 0.5 * (lo + hi)
+
+
+def gain_lut(factor: float) -> np.ndarray:
+    """颜色扰动查找表，与 np.clip(img * factor, 0, 255).astype(np.uint8) 逐值一致"""
+    return np.clip(np.arange(256, dtype=np.float64) * factor, 0, 255).astype(np.uint8)
+
+
+def gaussian_noise_int8(shape, noise_level: float) -> np.ndarray:
+    """直接生成 int8 高斯噪点（饱和到 ±127）"""
+    noise = np.empty(shape, dtype=np.int8)
+    # 按单通道二维视图填充，否则 randn 的 mean/stddev 只作用于第一个通道
+    cv2.randn(noise.reshape(shape[0], -1), 0, equivalent_noise_sigma(float(noise_level)))
+    return noise
+
+
+def apply_pixel_ops(img_np, noise_level=2.0, factor=1.0, opacity=1.0, noise=None):
+    """
+    融合像素算子：加噪点 → 颜色增益 → 写入透明度
+    - 噪点用 cv2.add 的混合位深饱和加法，uint8 + int8 → uint8
+    - 颜色增益用 256 项 LUT 原地完成
+    - 透明度直接写入 alpha 通道常数
+    :param noise: 可选，外部提供的 int8 噪点（形状与 img_np 相同）
+    :return: uint8 图像；opacity < 1 时为 RGBA
+    """
+    if noise is None and noise_level > 0:
+        noise = gaussian_noise_int8(img_np.shape, noise_level)
+    owned = noise is not None
+    if owned:
+        img_np = cv2.add(img_np, noise, dtype=cv2.CV_8U)
+
+    if factor != 1.0:
+        # 已经是新数组时原地查表，否则由 LUT 分配输出
+        img_np = cv2.LUT(img_np, gain_lut(factor), dst=img_np if owned else None)
+        owned = True
+
+    if opacity < 1.0:
+        if img_np.shape[2] == 3:
+            img_np = cv2.cvtColor(img_np, cv2.COLOR_RGB2RGBA)
+            img_np[..., 3] = np.uint8(np.float32(255) * np.float32(opacity))
+        else:
+            if not owned:
+                img_np = img_np.copy()
+            img_np[..., 3] = (img_np[..., 3].astype(np.float32) * opacity).astype(np.uint8)
+    return img_np
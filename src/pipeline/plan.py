@@ -0,0 +1,159 @@
+# src/pipeline/plan.py
+# 执行计划 - 每批把 ImageProcessConfig 编译一次：校验参数，只保留生效的阶段，逐图不再解析配置
+
+import random
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from src.config import ImageProcessConfig
+from src.pipeline.fill import FILL_MODES
+from src.pipeline.encoder import normalize_format
+from src.pipeline.executor import EXECUTOR_KINDS
+from src.pipeline.geometry import compile_geometry
+from src.pipeline.naming import validate_template
+from src.pipeline.quality import QualityTier, QUALITY_TIERS, resolve_tier
+
+# 阶段按执行顺序排列
+STAGES = ("flip", "rotate", "perspective", "scale", "elastic", "noise", "color", "opacity", "fill")
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """
+    编译后的不可变执行计划（可 pickle，进程池直接传递）
+    未启用的阶段参数为 None，逐图处理时直接跳过，也不抽取随机数
+    """
+    stages: Tuple[str, ...]
+    hflip: bool = False
+    vflip: bool = False
+    rotation: Optional[Tuple[float, float]] = None
+    perspective: Optional[Tuple[float, float]] = None
+    scale_x: float = 1.0
+    scale_y: float = 1.0
+    elastic: Optional[Tuple[float, float, bool]] = None
+    noise_level: float = 0.0
+    color_jitter: float = 0.0
+    opacity: float = 1.0
+    fill_mode: str = "reflect"
+    single_pass: bool = True
+    tile_size: int = 0
+    tier: QualityTier = QUALITY_TIERS["final"]
+
+    def has(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def draw_angle(self) -> float:
+        """双区间随机旋转角：各一半概率落在 [-max, -min] 或 [min, max]"""
+        if self.rotation is None:
+            return 0.0
+        lo, hi = self.rotation
+        if random.random() < 0.5:
+            return random.uniform(-hi, -lo)
+        return random.uniform(lo, hi)
+
+    def draw_shift(self) -> float:
+        if self.perspective is None:
+            return 0.0
+        return random.uniform(*self.perspective)
+
+    def draw_factor(self) -> float:
+        if not self.color_jitter:
+            return 1.0
+        return random.uniform(1 - self.color_jitter, 1 + self.color_jitter)
+
+    def geometry(self, w: int, h: int, angle: float = 0.0, shift: float = 0.0, with_scale: bool = True):
+        """合成几何矩阵；with_scale=False 用于模糊背景（原实现在缩放前取背景）"""
+        if with_scale:
+            return compile_geometry(w, h, self.hflip, self.vflip, angle, shift, self.scale_x, self.scale_y)
+        return compile_geometry(w, h, self.hflip, self.vflip, angle, shift)
+
+
+def _check_range(name: str, lo: float, hi: float):
+    if lo < 0 or hi < 0:
+        raise ValueError(f"{name} 不能为负数: ({lo}, {hi})")
+    if lo > hi:
+        raise ValueError(f"{name} 最小值大于最大值: ({lo}, {hi})")
+
+
+def compile_plan(config: ImageProcessConfig) -> ExecutionPlan:
+    """
+    校验配置并编译执行计划
+    :raises ValueError: 参数不合法
+    """
+    _check_range("旋转角度", config.rot_min, config.rot_max)
+    _check_range("透视偏移", config.persp_min, config.persp_max)
+    if not 0.0 <= config.opacity <= 1.0:
+        raise ValueError(f"透明度应在 0~1 之间: {config.opacity}")
+    if config.noise_level < 0:
+        raise ValueError(f"噪点强度不能为负数: {config.noise_level}")
+    if not 0.0 <= config.color_jitter < 1.0:
+        raise ValueError(f"颜色扰动应在 0~1 之间: {config.color_jitter}")
+    if config.scale_x <= 0 or config.scale_y <= 0:
+        raise ValueError(f"缩放倍数必须大于 0: ({config.scale_x}, {config.scale_y})")
+    if config.distortion_strength < 0:
+        raise ValueError(f"形变强度不能为负数: {config.distortion_strength}")
+    if config.distortion_strength > 0 and config.distortion_smoothness <= 0:
+        raise ValueError(f"形变平滑度必须大于 0: {config.distortion_smoothness}")
+    if config.fill_mode not in FILL_MODES:
+        raise ValueError(f"不支持的填充方式: {config.fill_mode}，可选 {FILL_MODES}")
+    if config.tile_size < 0:
+        raise ValueError(f"分块大小不能为负数: {config.tile_size}")
+    validate_template(config.name_template)
+    normalize_format(config.output_format)
+    if not 1 <= config.output_quality <= 100:
+        raise ValueError(f"JPEG 质量应在 1~100 之间: {config.output_quality}")
+    if not 0 <= config.compression_level <= 9:
+        raise ValueError(f"PNG 压缩级别应在 0~9 之间: {config.compression_level}")
+    executors = EXECUTOR_KINDS + ("stream",)
+    if (config.executor or "").lower() not in executors:
+        raise ValueError(f"未知的并行方式: {config.executor}，可选 {executors}")
+    if config.workers < 0:
+        raise ValueError(f"并行数不能为负数: {config.workers}")
+    if config.variants_per_image < 1:
+        raise ValueError(f"每张变体数至少为 1: {config.variants_per_image}")
+    if config.batch_size < 0:
+        raise ValueError(f"同尺寸批大小不能为负数: {config.batch_size}")
+    tier = resolve_tier(config.quality)
+
+    rotation = (config.rot_min, config.rot_max) if config.rot_max > 0 else None
+    perspective = (config.persp_min, config.persp_max) if config.persp_max > 0 else None
+    scaled = config.scale_x != 1.0 or config.scale_y != 1.0
+    elastic = None
+    if config.distortion_strength > 0:
+        elastic = (config.distortion_strength, config.distortion_smoothness, config.fast_elastic)
+
+    active = {
+        "flip": config.hflip or config.vflip,
+        "rotate": rotation is not None,
+        "perspective": perspective is not None,
+        "scale": scaled,
+        "elastic": elastic is not None,
+        "noise": config.noise_level > 0,
+        "color": config.color_jitter > 0,
+        "opacity": config.opacity < 1.0,
+        "fill": scaled and config.fill_mode != "reflect",
+    }
+    return ExecutionPlan(
+        stages=tuple(s for s in STAGES if active[s]),
+        hflip=config.hflip,
+        vflip=config.vflip,
+        rotation=rotation,
+        perspective=perspective,
+        scale_x=config.scale_x,
+        scale_y=config.scale_y,
+        elastic=elastic,
+        noise_level=config.noise_level,
+        color_jitter=config.color_jitter,
+        opacity=config.opacity,
+        fill_mode=config.fill_mode,
+        single_pass=config.single_pass_remap,
+        tile_size=config.tile_size,
+        tier=tier,
+    )
+
+
+def as_plan(config_or_plan) -> ExecutionPlan:
+    """接受 ImageProcessConfig 或已编译的 ExecutionPlan"""
+    if isinstance(config_or_plan, ExecutionPlan):
+        return config_or_plan
+    return compile_plan(config_or_plan)
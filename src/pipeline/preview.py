@@ -0,0 +1,126 @@
+# src/pipeline/preview.py
+# 实时预览引擎 - 在缩小的代理图上跑同一条流水线；后台单线程渲染，只保留最新请求，过期结果直接丢弃
+
+import threading
+import time
+from dataclasses import replace
+import cv2
+
+from src.config import ImageProcessConfig
+from src.ImageBatchProcessor_utils import transform_image
+from src.pipeline.decoder import decode_file
+from src.pipeline.displacement import rescaled_params
+
+# 代理图最长边
+PREVIEW_MAX_SIDE = 640
+
+
+def load_proxy(path, max_side: int = PREVIEW_MAX_SIDE):
+    """
+    解码代理图：JPEG 直接降采样解码，再 INTER_AREA 缩到 max_side 以内
+    :return: (只读 RGB 数组, 代理图 / 原图 的缩小比例)
+    """
+    img, (w, h) = decode_file(path, max_side=max_side)
+    ph, pw = img.shape[:2]
+    if max(pw, ph) > max_side:
+        r = max_side / max(pw, ph)
+        pw, ph = max(1, round(pw * r)), max(1, round(ph * r))
+        img = cv2.resize(img, (pw, ph), interpolation=cv2.INTER_AREA)
+    img.setflags(write=False)
+    return img, pw / w
+
+
+def preview_config(config: ImageProcessConfig, ratio: float) -> ImageProcessConfig:
+    """
+    代理图上的等效配置
+    - 弹性形变按缩小比例换算，噪点按缩小后的平均效果减弱
+    - 透视偏移是绝对像素，同样按缩小比例换算
+    - 固定 draft 画质、不分块
+    """
+    strength, smoothness = rescaled_params(config.distortion_strength, config.distortion_smoothness, ratio)
+    return replace(
+        config,
+        distortion_strength=strength,
+        distortion_smoothness=smoothness,
+        persp_min=config.persp_min * ratio,
+        persp_max=config.persp_max * ratio,
+        noise_level=config.noise_level * ratio,
+        quality="draft",
+        tile_size=0,
+    )
+
+
+class PreviewEngine:
+    """
+    后台预览渲染
+    request() 只记录最新的 (图片, 配置) 并返回代号；渲染线程总是取最新请求，
+    渲染前后都检查代号，过期的请求不再变换、过期的结果不回调
+    :param on_result: 渲染线程中回调 (代号, 路径, 图像或 None, 异常或 None, 耗时秒)
+    """
+
+    def __init__(self, on_result, max_side: int = PREVIEW_MAX_SIDE):
+        self.max_side = max_side
+        self._on_result = on_result
+        self._cond = threading.Condition()
+        self._pending = None
+        self._generation = 0
+        self._closed = False
+        self._proxy_path = None
+        self._proxy = None
+        self._thread = threading.Thread(target=self._loop, name="preview", daemon=True)
+        self._thread.start()
+
+    def request(self, path, config: ImageProcessConfig) -> int:
+        with self._cond:
+            self._generation += 1
+            self._pending = (self._generation, path, config)
+            self._cond.notify()
+            return self._generation
+
+    def cancel(self):
+        """作废尚未完成的请求"""
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self._generation
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending = None
+            self._cond.notify()
+
+    def proxy(self, path):
+        """代理图只缓存最近一张，调参时不重复解码"""
+        if path != self._proxy_path:
+            self._proxy = load_proxy(path, self.max_side)
+            self._proxy_path = path
+        return self._proxy
+
+    def render(self, path, config: ImageProcessConfig, generation: int = None):
+        """同步渲染一次预览；给定代号且已过期时返回 None"""
+        img, ratio = self.proxy(path)
+        if generation is not None and not self.is_current(generation):
+            return None
+        return transform_image(img, preview_config(config, ratio))
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                generation, path, config = self._pending
+                self._pending = None
+
+            start = time.perf_counter()
+            img, error = None, None
+            try:
+                img = self.render(path, config, generation)
+            except Exception as e:
+                error = e
+            if self.is_current(generation) and (img is not None or error is not None):
+                self._on_result(generation, path, img, error, time.perf_counter() - start)
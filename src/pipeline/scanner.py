@@ -0,0 +1,241 @@
+# src/pipeline/scanner.py
+# 文件夹扫描 - 线程池并行递归 os.scandir，按文件头魔数识别图片并只读文件头取宽高和格式
+# 只依赖标准库，界面和命令行加文件时不加载 cv2 / PIL；网络盘上每个目录 / 文件的延迟由多线程重叠
+
+import os
+import struct
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+# 扩展名是图片、但文件头无法识别时记为损坏 / 改错扩展名
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
+# 每个线程任务读取的文件数，过小则调度开销大，过大则结果回报不及时
+FILES_PER_TASK = 32
+# EXIF 方向为 5~8 时宽高互换（与 decoder.probe 一致）
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+# BITMAPCOREHEADER / INFOHEADER / V2~V5 头的长度
+_BMP_DIB_SIZES = (12, 40, 52, 56, 64, 108, 124)
+# 带尺寸的 JPEG SOF 段（排除 DHT=C4、JPG=C8、DAC=CC）
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    """文件头中的信息；宽高已按 EXIF 方向摆正，格式名与 PIL 一致"""
+    path: str
+    width: int
+    height: int
+    format: str
+    size: int
+
+
+def sniff(head: bytes) -> Optional[str]:
+    """按魔数识别格式，不是支持的图片时返回 None"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    # "BM" 只有两个字节，再要求 DIB 头长度是已知的几种之一，排除碰巧以 BM 开头的文件
+    if head.startswith(b"BM") and len(head) >= 18 and struct.unpack("<I", head[14:18])[0] in _BMP_DIB_SIZES:
+        return "BMP"
+    return None
+
+
+def _png_size(head: bytes):
+    if head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+
+def _webp_size(head: bytes):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        w, h = struct.unpack("<HH", head[26:30])
+        return w & 0x3FFF, h & 0x3FFF
+    if chunk == b"VP8L" and head[20:21] == b"\x2f":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+
+def _bmp_size(head: bytes):
+    (dib,) = struct.unpack("<I", head[14:18])
+    if dib == 12:
+        return struct.unpack("<HH", head[18:22])
+    if dib >= 40:
+        w, h = struct.unpack("<ii", head[18:26])
+        return w, abs(h)
+    return None
+
+
+def _exif_orientation(data: bytes) -> int:
+    """APP1 段内容中的 EXIF 方向标记（0x0112），没有时为 1"""
+    if not data.startswith(b"Exif\x00\x00"):
+        return 1
+    tiff = data[6:]
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None or len(tiff) < 8:
+        return 1
+    (ifd,) = struct.unpack(order + "I", tiff[4:8])
+    if ifd + 2 > len(tiff):
+        return 1
+    (count,) = struct.unpack(order + "H", tiff[ifd:ifd + 2])
+    for i in range(count):
+        entry = tiff[ifd + 2 + i * 12: ifd + 14 + i * 12]
+        if len(entry) < 12:
+            break
+        tag, _, _ = struct.unpack(order + "HHI", entry[:8])
+        if tag == 0x0112:
+            return struct.unpack(order + "H", entry[8:10])[0]
+    return 1
+
+
+def _jpeg_size(f):
+    """
+    逐段跳读 JPEG 标记直到 SOF，只读各段的 2 字节长度，不读压缩数据
+    :return: (摆正后的宽, 高)
+    """
+    f.seek(2)
+    orientation = 1
+    while True:
+        byte = f.read(1)
+        while byte == b"\xff":
+            marker = f.read(1)
+            if marker != b"\xff":
+                break
+            byte = marker
+        else:
+            return None
+        if not marker:
+            return None
+        code = marker[0]
+        # 无长度的独立标记
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            continue
+        if code in (0xD9, 0xDA):
+            return None
+        raw = f.read(2)
+        if len(raw) < 2:
+            return None
+        (length,) = struct.unpack(">H", raw)
+        if code in _JPEG_SOF:
+            seg = f.read(5)
+            if len(seg) < 5:
+                return None
+            h, w = struct.unpack(">HH", seg[1:5])
+            return (h, w) if orientation in _TRANSPOSED_ORIENTATIONS else (w, h)
+        if code == 0xE1 and orientation == 1:
+            orientation = _exif_orientation(f.read(length - 2))
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_header(path, size: int = -1) -> Optional[ImageInfo]:
+    """
+    按魔数识别并从文件头读取宽高，不解码像素
+    :return: 不是支持的图片或文件头损坏时为 None
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(32)
+            fmt = sniff(head)
+            if fmt is None:
+                return None
+            if fmt == "JPEG":
+                dims = _jpeg_size(f)
+            elif fmt == "PNG":
+                dims = _png_size(head)
+            elif fmt == "WEBP":
+                dims = _webp_size(head)
+            else:
+                dims = _bmp_size(head)
+            if size < 0:
+                size = os.fstat(f.fileno()).st_size
+    except (OSError, struct.error):
+        return None
+    if not dims or dims[0] <= 0 or dims[1] <= 0:
+        return None
+    return ImageInfo(os.fspath(path), int(dims[0]), int(dims[1]), fmt, size)
+
+
+def _list_dir(path):
+    """一层目录：(子目录, [(文件路径, 字节数)])；以 . 开头的隐藏子目录不返回，即不递归进入"""
+    dirs, files = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            dirs.append(entry.path)
+                    elif entry.is_file():
+                        files.append((entry.path, entry.stat().st_size))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return dirs, files
+
+
+def _read_headers(files, rejected):
+    infos = []
+    for path, size in files:
+        info = read_header(path, size)
+        if info is not None:
+            infos.append(info)
+        elif rejected is not None and path.lower().endswith(IMAGE_EXTENSIONS):
+            rejected.append(path)
+    return infos
+
+
+def iter_images(paths, workers: int = 0, recursive: bool = True, stop: threading.Event = None,
+                rejected: list = None) -> Iterator[ImageInfo]:
+    """
+    并行扫描文件和目录，按完成顺序逐个产出 ImageInfo
+    目录的列举和文件头读取都是线程池任务，列出子目录后立即提交，不等上一层读完
+    以 . 开头的隐藏子目录（.git、同步盘的 .sync 等）不进入；直接拖入的目录本身即使是隐藏目录也照常扫描
+    :param workers: 线程数，0 表示自动（I/O 密集，默认比 CPU 核心数多）
+    :param stop: 可选，置位后不再提交新任务并尽快返回
+    :param rejected: 可选列表，收集扩展名是图片但文件头无法识别（损坏 / 改错扩展名）的路径
+    """
+    workers = workers if workers and workers > 0 else min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+        pending = {}
+        top_files = []
+        for p in paths:
+            p = os.path.abspath(os.fspath(p))
+            if os.path.isdir(p):
+                pending[pool.submit(_list_dir, p)] = "dir"
+            elif os.path.isfile(p):
+                top_files.append((p, -1))
+        for i in range(0, len(top_files), FILES_PER_TASK):
+            pending[pool.submit(_read_headers, top_files[i:i + FILES_PER_TASK], rejected)] = "files"
+
+        while pending:
+            if stop is not None and stop.is_set():
+                for fut in pending:
+                    fut.cancel()
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                kind = pending.pop(fut)
+                if kind == "files":
+                    yield from fut.result()
+                    continue
+                dirs, files = fut.result()
+                if recursive:
+                    for d in dirs:
+                        pending[pool.submit(_list_dir, d)] = "dir"
+                for i in range(0, len(files), FILES_PER_TASK):
+                    pending[pool.submit(_read_headers, files[i:i + FILES_PER_TASK], rejected)] = "files"
+
+
+def scan_images(paths, workers: int = 0, recursive: bool = True, rejected: list = None):
+    """扫描全部并按路径排序，结果顺序与线程调度无关（命令行用）"""
+    return sorted(iter_images(paths, workers, recursive, rejected=rejected), key=lambda info: info.path)
@@ -0,0 +1,108 @@
+# src/pipeline/streaming.py
+# 流式流水线 - 解码 / 变换 / 编码写入 分阶段并行，阶段之间用有界队列连接
+
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Stage:
+    """流水线阶段：fn(value) -> value，由 workers 个线程并行执行"""
+
+    def __init__(self, name: str, fn, workers: int = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+
+
+class StagedPipeline:
+    """
+    多阶段流水线
+    - 每个阶段一组线程，阶段之间是容量为 queue_size 的有界队列，
+      因此无论批量多大，内存中最多只有 (队列容量 + 线程数) 张图
+    - I/O 阶段（读盘 / 写盘）与计算阶段重叠执行
+    - 任一阶段出错时，该项带着异常直接流到末尾，不影响其他项
+    run(items) 按完成顺序产出 (item, result, error)
+    :param on_wait: 可选，回调 (item, 阶段名, 秒)，报告每项在进入该阶段前的排队时间
+    """
+
+    def __init__(self, stages, queue_size: int = 4, on_wait=None):
+        self.stages = list(stages)
+        self.queue_size = max(1, int(queue_size))
+        self.on_wait = on_wait
+
+    def run(self, items):
+        stop = threading.Event()
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = []
+
+        def _put(q, entry):
+            # 下游已停止消费时不再阻塞
+            while not stop.is_set():
+                try:
+                    q.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _feed():
+            for item in items:
+                if not _put(queues[0], (item, item, None, time.perf_counter())):
+                    return
+            for _ in range(self.stages[0].workers):
+                _put(queues[0], _DONE)
+
+        def _work(index, stage, remaining, lock):
+            q_in, q_out = queues[index], queues[index + 1]
+            while True:
+                entry = q_in.get()
+                if entry is _DONE:
+                    break
+                item, value, error, queued = entry
+                if self.on_wait is not None:
+                    self.on_wait(item, stage.name, time.perf_counter() - queued)
+                if error is None:
+                    try:
+                        value = stage.fn(value)
+                    except Exception as e:
+                        value, error = None, e
+                if not _put(q_out, (item, value, error, time.perf_counter())):
+                    return
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                # 本阶段全部线程结束后，通知下游阶段的每个线程
+                next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+                for _ in range(next_workers):
+                    _put(q_out, _DONE)
+
+        for index, stage in enumerate(self.stages):
+            remaining, lock = [stage.workers], threading.Lock()
+            for n in range(stage.workers):
+                t = threading.Thread(target=_work, args=(index, stage, remaining, lock),
+                                     name=f"{stage.name}-{n}", daemon=True)
+                threads.append(t)
+        feeder = threading.Thread(target=_feed, name="feeder", daemon=True)
+        threads.append(feeder)
+        for t in threads:
+            t.start()
+
+        try:
+            while True:
+                entry = queues[-1].get()
+                if entry is _DONE:
+                    break
+                yield entry[:3]
+        finally:
+            stop.set()
+            # 解除可能阻塞在 get 上的线程
+            for q, stage in zip(queues, self.stages):
+                for _ in range(stage.workers):
+                    try:
+                        q.put_nowait(_DONE)
+                    except queue.Full:
+                        pass
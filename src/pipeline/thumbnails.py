@@ -0,0 +1,69 @@
+# src/pipeline/thumbnails.py
+# 文件列表缩略图 - 后台线程池缩小解码，界面线程只负责贴图，拖入大批文件时界面不卡
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 每个线程任务生成的缩略图数，同时也是一次回调的条数
+THUMBS_PER_TASK = 16
+
+
+def make_thumbnail(path, size: int):
+    """
+    生成不超过 size×size 的 RGB 缩略图
+    JPEG 用 Image.draft 直接按 1/2~1/8 降采样解码，不解码全分辨率像素
+    :return: (宽, 高, RGB 字节)
+    """
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+    img.thumbnail((size, size))
+    return img.width, img.height, img.tobytes("raw", "RGB")
+
+
+class ThumbnailLoader:
+    """
+    后台生成缩略图；request() 只提交任务，结果在工作线程中分块回调
+    cancel()（清空列表、换缩略图大小）后代号加一，旧代号的任务直接跳过、结果不回调
+    :param on_ready: 工作线程中回调 (代号, [(键, 宽, 高, RGB 字节), ...])；无法解码的文件不在其中
+    """
+
+    def __init__(self, on_ready, workers: int = 4):
+        self._on_ready = on_ready
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumb")
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def request(self, entries, size: int) -> int:
+        """:param entries: [(键, 路径)]，键原样随结果返回"""
+        generation = self._generation
+        entries = list(entries)
+        for i in range(0, len(entries), THUMBS_PER_TASK):
+            self._pool.submit(self._load, generation, entries[i:i + THUMBS_PER_TASK], size)
+        return generation
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self._generation
+
+    def close(self):
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _load(self, generation, entries, size):
+        results = []
+        for key, path in entries:
+            if not self.is_current(generation):
+                return
+            try:
+                results.append((key, *make_thumbnail(path, size)))
+            except Exception:
+                # 扫描时已按文件头识别过，这里失败（如文件刚被删除）只是没有缩略图
+                continue
+        if results and self.is_current(generation):
+            self._on_ready(generation, results)
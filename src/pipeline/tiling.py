@@ -0,0 +1,52 @@
+# src/pipeline/tiling.py
+# 分块渲染 - 按输出分块生成取样图并重采样，整帧只保留源图和预分配的输出，峰值内存取决于块大小
+
+import cv2
+import numpy as np
+
+from src.pipeline.displacement import sample_grid
+from src.pipeline.geometry import composed_maps
+from src.pipeline.noise_bank import noise_bank
+from src.pipeline.pixel_ops import apply_pixel_ops
+from src.pipeline.quality import remap_maps
+
+
+def iter_tiles(w: int, h: int, tile_size: int):
+    """按行优先产出 (x0, y0, tw, th)"""
+    for y0 in range(0, h, tile_size):
+        for x0 in range(0, w, tile_size):
+            yield x0, y0, min(tile_size, w - x0), min(tile_size, h - y0)
+
+
+def render_tiled(src, M, canvas_size, grids=None, tile_size: int = 512,
+                 interpolation=cv2.INTER_LANCZOS4, border_mode=cv2.BORDER_REFLECT,
+                 noise_level: float = 0.0, factor: float = 1.0, opacity: float = 1.0,
+                 fixed_point: bool = False):
+    """
+    分块执行 几何+弹性 单次重采样 和 像素融合算子
+    - 每块的取样图直接指向完整源图，边界反射与整图处理完全一致，
+      因此块之间不需要重叠，也没有拼接缝
+    - 弹性位移只保存低分辨率控制网格，每块按需双线性取出，与整图放大逐像素相同
+    - 取样图、位移、噪点等 float32 临时数组都只有块大小
+    :param M: 源图坐标 → 输出坐标 的 3x3 矩阵
+    :param canvas_size: 输出 (w, h)
+    :param grids: 可选，(gx, gy) 弹性位移控制网格
+    :param fixed_point: 取样图转为 CV_16SC2 定点格式后再 remap
+    :return: 预分配的 uint8 输出（opacity < 1 时为 RGBA）
+    """
+    w, h = canvas_size
+    channels = 4 if opacity < 1.0 else src.shape[2]
+    out = np.empty((h, w, channels), dtype=np.uint8)
+
+    for x0, y0, tw, th in iter_tiles(w, h, tile_size):
+        if grids is not None:
+            dx = sample_grid(grids[0], (h, w), x0, y0, tw, th)
+            dy = sample_grid(grids[1], (h, w), x0, y0, tw, th)
+        else:
+            dx = np.zeros((th, tw), dtype=np.float32)
+            dy = np.zeros((th, tw), dtype=np.float32)
+        map1, map2 = remap_maps(composed_maps(M, dx, dy, x0, y0), fixed_point)
+        tile = cv2.remap(src, map1, map2, interpolation=interpolation, borderMode=border_mode)
+        noise = noise_bank.sample(tile.shape, noise_level) if noise_level > 0 else None
+        out[y0:y0 + th, x0:x0 + tw] = apply_pixel_ops(tile, noise_level, factor, opacity, noise=noise)
+    return out
@@ -0,0 +1,34 @@
+# src/startup_timer.py
+# 启动耗时测量 - 按阶段记录界面启动耗时，--profile-startup 时打印分解表
+
+import time
+
+
+class StartupTimer:
+    """
+    mark(name) 记录从上一个标记到现在的耗时
+    :param start: 计时起点（perf_counter），默认为创建时刻
+    """
+
+    def __init__(self, enabled: bool = False, start: float = None):
+        self.enabled = enabled
+        self.start = time.perf_counter() if start is None else start
+        self._last = self.start
+        self.phases = []
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return self._last - self.start
+
+    def report(self) -> str:
+        width = max((len(name) for name, _ in self.phases), default=0) + 2
+        lines = ["启动耗时分解:"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<{width}}{seconds * 1000:>8.1f} ms")
+        lines.append(f"  {'合计':<{width}}{self.total * 1000:>8.1f} ms")
+        return "\n".join(lines)
@@ -7,19 +7,25 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import pyqtSignal, Qt, QSize, QSettings, QRect,pyqtSlot,QTimer
 from PyQt6.QtGui import QPixmap, QImage, QIcon, QPainter
-from PIL import Image
 from src.config import ImageProcessConfig
 from src import __version__ ,get_resource_path
 from dataclasses import fields
 from src.ui.common_widgets import ProgressDialog, FloatSliderWidget, DropLineEdit
 from src.ui.menu_bar import MenuManager  
 from src.ui.comfyui_section import ComfyUISection
+from src.ui.preview_panel import PreviewPanel
 from src.config import GlobalConfig    
 class ImageBatchView(QMainWindow):
     files_dropped = pyqtSignal(list)
     output_folder_selected = pyqtSignal(str)
     process_requested = pyqtSignal(ImageProcessConfig)
     file_removed = pyqtSignal(str)
+    # 批量删除：模型文件登记表中的序号列表
+    files_removed = pyqtSignal(list)
+    # ComfyUI 页延迟创建完成
+    comfy_section_ready = pyqtSignal(object)
+    # 缩略图线程 → UI 线程：(代号, [(键, 宽, 高, RGB 字节)])
+    thumbnails_ready = pyqtSignal(int, object)
 
     def __init__(self):
         super().__init__()
@@ -54,6 +60,11 @@ class ImageBatchView(QMainWindow):
         self.tree.header().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
         self.tree.header().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         layout.addWidget(self.tree)
+        # 缩略图在后台生成（第一次加入文件时创建线程池），按键找回列表项
+        self._thumb_loader = None
+        self._thumb_items = {}
+        self._thumb_keys = 0
+        self.thumbnails_ready.connect(self._set_thumbnails)
 
         # 输出目录选择
         out_layout = QHBoxLayout()
@@ -81,10 +92,18 @@ class ImageBatchView(QMainWindow):
         param_tab = QWidget()
         param_layout = QVBoxLayout(param_tab)
 
-        # 动态参数控件
+        # 动态参数控件（左）+ 实时预览（右）
         self.param_widgets = {}
         param_layout.setSpacing(5)
-        self.build_dynamic_params(param_layout)
+        body_layout = QHBoxLayout()
+        fields_layout = QVBoxLayout()
+        self.build_dynamic_params(fields_layout)
+        fields_layout.addStretch()
+        body_layout.addLayout(fields_layout)
+        self.preview_panel = PreviewPanel(self.collect_parameters, self)
+        body_layout.addWidget(self.preview_panel, 1)
+        param_layout.addLayout(body_layout)
+        self.connect_preview()
 
         # 处理按钮（✅ 要加到布局中）
         process_btn = QPushButton("开始处理")
@@ -95,12 +114,33 @@ class ImageBatchView(QMainWindow):
         self.tab_widget.addTab(param_tab, "图像处理")
 
         # 第二个 Tab：ComfyUI
-        self.comfy_section = ComfyUISection()
-        self.tab_widget.addTab(self.comfy_section, "ComfyUI")
+        # 创建时会同步扫描网盘上的工作流/提示词目录，推迟到主窗口显示之后
+        self.comfy_section = None
+        self._comfy_placeholder = QLabel("正在加载 ComfyUI…")
+        self._comfy_placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.tab_widget.addTab(self._comfy_placeholder, "ComfyUI")
 
         #读取配置
         self.load_settings()
         
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.comfy_section is None:
+            QTimer.singleShot(0, self.build_comfy_section)
+
+    def build_comfy_section(self):
+        """创建 ComfyUI 页，替换占位页，并补上它的持久化设置和初始信号"""
+        if self.comfy_section is not None:
+            return
+        self.comfy_section = ComfyUISection()
+        index = self.tab_widget.indexOf(self._comfy_placeholder)
+        self.tab_widget.removeTab(index)
+        self.tab_widget.insertTab(index, self.comfy_section, "ComfyUI")
+        self._comfy_placeholder.deleteLater()
+        self.load_settings(self.comfy_section)
+        self.comfy_section_ready.emit(self.comfy_section)
+        self.emit_initial_signals(self.comfy_section)
+
     def build_dynamic_params(self, parent_layout):
         params_layout = QVBoxLayout()
         params_layout.setSpacing(5)
@@ -141,18 +181,37 @@ class ImageBatchView(QMainWindow):
         
         parent_layout.addLayout(params_layout)
 
+    def connect_preview(self):
+        """选中的图片或任一参数变化时刷新预览"""
+        self.tree.currentItemChanged.connect(
+            lambda current, _: self.preview_panel.set_image(current.text(1) if current else None))
+        for widget in self.param_widgets.values():
+            if isinstance(widget, QCheckBox):
+                widget.toggled.connect(self.preview_panel.schedule)
+            elif isinstance(widget, FloatSliderWidget):
+                widget.valueChanged.connect(self.preview_panel.schedule)
+            else:
+                widget.textChanged.connect(self.preview_panel.schedule)
+
     def select_output_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "选择输出文件夹")
         if folder:
             self.output_entry.setText(folder)
             self.output_folder_selected.emit(folder)
 
+    @property
+    def thumb_loader(self):
+        if self._thumb_loader is None:
+            from src.pipeline.thumbnails import ThumbnailLoader
+            self._thumb_loader = ThumbnailLoader(lambda gen, results: self.thumbnails_ready.emit(gen, results))
+        return self._thumb_loader
+
     def change_thumb_size(self, size):
         self.tree.setIconSize(QSize(size, size))
-        for i in range(self.tree.topLevelItemCount()):
-            item = self.tree.topLevelItem(i)
-            path = item.text(1)
-            self.set_item_icon(item, path, size)
+        # 旧尺寸还没生成完的缩略图作废，按新尺寸全部重新生成
+        self.thumb_loader.cancel()
+        entries = [(key, item.text(1)) for key, item in self._thumb_items.items()]
+        self.thumb_loader.request(entries, size)
 
     def collect_parameters(self):
         kwargs = {}
@@ -187,34 +246,67 @@ class ImageBatchView(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "错误", f"参数输入不正确: {e}")
 
-    def set_item_icon(self, item, path, size):
-        img = Image.open(path).convert("RGB")
-        img.thumbnail((size, size))
-        img_qt = QImage(img.tobytes(), img.width, img.height, img.width * 3, QImage.Format.Format_RGB888)
-        icon = QIcon(QPixmap.fromImage(img_qt))
-        item.setIcon(0, icon)
+    def add_file_item(self, path, index=None, info=None):
+        self.add_file_items([(path, index, info)])
+
+    def add_file_items(self, entries):
+        """
+        批量加入列表项，缩略图交给后台线程生成，生成好后再贴上
+        :param entries: [(路径, 序号, ImageInfo)]；序号为模型文件登记表中的序号，删除时按序号回传，
+                        ImageInfo 为扫描结果，宽高格式显示在提示中（两者都可为 None）
+        """
+        items, requests = [], []
+        for path, index, info in entries:
+            item = QTreeWidgetItem(["", path])
+            if index is not None:
+                item.setData(1, Qt.ItemDataRole.UserRole, index)
+            if info is not None:
+                item.setToolTip(1, f"{info.width}×{info.height} {info.format}，{info.size / 1024:.0f} KB")
+            self._thumb_keys += 1
+            item.setData(0, Qt.ItemDataRole.UserRole, self._thumb_keys)
+            self._thumb_items[self._thumb_keys] = item
+            items.append(item)
+            requests.append((self._thumb_keys, path))
+        self.tree.addTopLevelItems(items)
+        self.thumb_loader.request(requests, self.tree.iconSize().width())
+
+    @pyqtSlot(int, object)
+    def _set_thumbnails(self, generation, results):
+        if not self.thumb_loader.is_current(generation):
+            return
+        for key, w, h, data in results:
+            item = self._thumb_items.get(key)
+            if item is None:
+                continue
+            img_qt = QImage(data, w, h, w * 3, QImage.Format.Format_RGB888)
+            item.setIcon(0, QIcon(QPixmap.fromImage(img_qt)))
+            self.tree.setIconSize(QSize(w, h))
+
+    def _forget_item(self, item):
+        self._thumb_items.pop(item.data(0, Qt.ItemDataRole.UserRole), None)
 
-    def add_file_item(self, path):
-        size = self.tree.iconSize().width()
-        item = QTreeWidgetItem(["", path])
-        img = Image.open(path).convert("RGB")
-        img.thumbnail((size, size))
-        data = img.tobytes("raw", "RGB")
-        img_qt = QImage(data, img.width, img.height, img.width * 3, QImage.Format.Format_RGB888)
-        icon = QIcon(QPixmap.fromImage(img_qt))
-        item.setIcon(0, icon)
-        self.tree.addTopLevelItem(item)
-        self.tree.setIconSize(QPixmap.fromImage(img_qt).size())
     def clear_all_items(self):
+        if self._thumb_loader is not None:
+            self._thumb_loader.cancel()
+        self._thumb_items.clear()
         self.tree.clear()
+        self.preview_panel.set_image(None)
         self.file_removed.emit("__CLEAR_ALL__")
     def keyPressEvent(self, event):
         if event.key() == Qt.Key.Key_Delete:
+            indices = []
             for item in self.tree.selectedItems():
-                self.file_removed.emit(item.text(1))
+                index = item.data(1, Qt.ItemDataRole.UserRole)
+                if index is None:
+                    self.file_removed.emit(item.text(1))
+                else:
+                    indices.append(index)
+                self._forget_item(item)
                 idx = self.tree.indexOfTopLevelItem(item)
                 if idx != -1:
                     self.tree.takeTopLevelItem(idx)
+            if indices:
+                self.files_removed.emit(indices)
         else:
             super().keyPressEvent(event)
     def dragEnterEvent(self, event):
@@ -238,8 +330,8 @@ class ImageBatchView(QMainWindow):
                 elif hasattr(widget, "text"):
                     self.settings.setValue(key, widget.text())
 
-    def load_settings(self):
-        for widget in self.findChildren(QWidget):
+    def load_settings(self, root=None):
+        for widget in (root or self).findChildren(QWidget):
             if widget.property("persist"):
                 key = widget.objectName()
                 val = self.settings.value(key)
@@ -252,6 +344,9 @@ class ImageBatchView(QMainWindow):
                         widget.setText(val)
         #！在Main文件里，等UI全都初始化完成後再調用一次 信號
     def closeEvent(self, event):
+        self.preview_panel.shutdown()
+        if self._thumb_loader is not None:
+            self._thumb_loader.close()
         self.save_settings()
         super().closeEvent(event)
 
@@ -260,10 +355,10 @@ class ImageBatchView(QMainWindow):
         self.progress_dialog.show()
         
    
-    def emit_initial_signals(self):
+    def emit_initial_signals(self, root=None):
          #！在Main文件里，等UI全都初始化完成後再調用一次 信號
-        """🆕 配置加载完成后，手动触发必要的信号"""
-        for widget in self.findChildren(QWidget):
+        """🆕 配置加载完成后，手动触发必要的信号；root 为延迟创建的子页面时只处理该页"""
+        for widget in (root or self).findChildren(QWidget):
             if widget.property("persist"):
                 key = widget.objectName()
                 val = self.settings.value(key)
@@ -19,14 +19,22 @@ class ProgressDialog(QDialog):
         self.progress_bar = QProgressBar()
         self.progress_bar.setRange(0, total)
         self.progress_bar.setValue(0)
+        # 最近若干张的平均耗时和瓶颈
+        self.summary_label = QLabel("")
+        self.summary_label.setWordWrap(True)
 
         layout.addWidget(self.label)
         layout.addWidget(self.progress_bar)
+        layout.addWidget(self.summary_label)
 
     @pyqtSlot(int)
     def set_progress(self, value):
         self.progress_bar.setValue(value)
 
+    @pyqtSlot(str)
+    def set_summary(self, text):
+        self.summary_label.setText(text)
+
 class FloatSliderWidget(QSlider):
     def __init__(self,
                  minimum=0.0,
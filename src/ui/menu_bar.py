@@ -4,7 +4,7 @@ import os
 import json
 from dataclasses import asdict
 from PyQt6.QtWidgets import (
-    QMenuBar, QMenu, QInputDialog, QMessageBox,QWidget
+    QMenuBar, QMenu, QInputDialog, QMessageBox,QWidget, QFileDialog
 )
 from PyQt6.QtCore import QSettings
 from src import __version__
@@ -45,6 +45,10 @@ class MenuManager:
         self.view.delete_menu = preset_menu.addMenu("删除预设")
         self.refresh_presets_menu()
 
+        # 导出为 presets.json，供命令行 --preset 使用
+        export_action = preset_menu.addAction("导出预设…")
+        export_action.triggered.connect(self.export_presets)
+
         menu_bar.addMenu(preset_menu)
         self.view.menu_presets = preset_menu
 
@@ -103,6 +107,25 @@ class MenuManager:
                     if path:  # 只有非空路径才发射信号
                         print(f"🚀 触发信号: {key} -> {path}")
                         widget.pathSelectedSignal.emit(path)
+    def export_presets(self):
+        """把全部预设导出为 {"预设名": {字段: 值}} 的 JSON 文件（命令行 --presets-file 读取的格式）"""
+        self.settings.beginGroup("Presets")
+        presets = {name: json.loads(self.settings.value(name)) for name in self.settings.allKeys()}
+        self.settings.endGroup()
+        if not presets:
+            QMessageBox.information(self.view, "导出预设", "还没有保存任何预设")
+            return
+        path, _ = QFileDialog.getSaveFileName(self.view, "导出预设", "presets.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(presets, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            QMessageBox.critical(self.view, "错误", f"导出失败: {e}")
+            return
+        QMessageBox.information(self.view, "导出预设", f"已导出 {len(presets)} 个预设到 {path}")
+
     def delete_preset(self, name):
         self.settings.remove(f"Presets/{name}")
         self.refresh_presets_menu()
@@ -0,0 +1,93 @@
+# src/ui/preview_panel.py
+# 实时预览面板 - 参数变化后防抖，交给后台 PreviewEngine 在代理图上渲染
+
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QPixmap, QImage
+
+
+class PreviewPanel(QWidget):
+    # 渲染线程 → UI 线程（跨线程信号自动排队）
+    rendered = pyqtSignal(int, object, object, float)
+
+    def __init__(self, config_provider, parent=None, debounce_ms: int = 60):
+        """
+        :param config_provider: 无参函数，返回当前界面上的 ImageProcessConfig
+        :param debounce_ms: 参数连续变化时，停止变化多久后才渲染
+        """
+        super().__init__(parent)
+        self._config_provider = config_provider
+        self._path = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.image_label = QLabel("选择图片后显示预览")
+        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.image_label.setMinimumSize(320, 320)
+        self.status_label = QLabel("")
+        layout.addWidget(self.image_label, 1)
+        layout.addWidget(self.status_label)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._request)
+
+        # 渲染引擎（连带 cv2 / numpy）在第一次预览时才创建
+        self._engine = None
+        self.rendered.connect(self._show)
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from src.pipeline.preview import PreviewEngine
+            self._engine = PreviewEngine(lambda gen, path, img, err, secs: self.rendered.emit(gen, img, err, secs))
+        return self._engine
+
+    def set_image(self, path):
+        """切换预览的图片；None 清空预览"""
+        self._path = path
+        if path:
+            self._timer.start(0)
+        else:
+            self._timer.stop()
+            if self._engine is not None:
+                self._engine.cancel()
+            self.image_label.clear()
+            self.image_label.setText("选择图片后显示预览")
+            self.status_label.setText("")
+
+    def schedule(self, *_):
+        """参数变化：重新计时，连续拖动滑竿时只渲染最后一次"""
+        if self._path:
+            self._timer.start()
+
+    def shutdown(self):
+        self._timer.stop()
+        if self._engine is not None:
+            self._engine.close()
+
+    def _request(self):
+        try:
+            config = self._config_provider()
+        except Exception:
+            # 输入框编辑到一半（如空字符串）时先不渲染
+            return
+        self.engine.request(self._path, config)
+
+    @pyqtSlot(int, object, object, float)
+    def _show(self, generation, img, error, seconds):
+        if not self.engine.is_current(generation):
+            return
+        if error is not None:
+            self.status_label.setText(f"预览失败: {error}")
+            return
+        import numpy as np
+
+        img = np.ascontiguousarray(img)
+        h, w, c = img.shape
+        fmt = QImage.Format.Format_RGBA8888 if c == 4 else QImage.Format.Format_RGB888
+        pixmap = QPixmap.fromImage(QImage(img.data, w, h, img.strides[0], fmt).copy())
+        self.image_label.setPixmap(pixmap.scaled(self.image_label.size(), Qt.AspectRatioMode.KeepAspectRatio,
+                                                 Qt.TransformationMode.SmoothTransformation))
+        self.status_label.setText(f"预览 {w}x{h} · {seconds * 1000:.0f} ms")
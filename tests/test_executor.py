@@ -0,0 +1,58 @@
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+from src.config import ImageProcessConfig
+from src.ImageBatchProcessor_model import ImageBatchModel
+
+
+def test_process_workers_draw_independent_randomness(tmp_path):
+    # 内容完全相同的源图，关掉自带独立随机源的噪点和扭曲，输出只因 numpy 抽取的旋转 / 透视 / 颜色而不同
+    img = np.random.RandomState(0).randint(0, 256, (48, 64, 3), np.uint8)
+    model = ImageBatchModel()
+    model.set_output_dir(str(tmp_path / "out"))
+    for i in range(8):
+        path = str(tmp_path / "in" / f"src{i}.png")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cv2.imwrite(path, img)
+        model.files.add(path)
+    outputs = []
+    failures = model.process_all(
+        ImageProcessConfig(executor="process", workers=4, batch_size=2, resume=False,
+                           noise_level=0, distortion_strength=0),
+        lambda done, file, record, error: outputs.append(record.path))
+    assert not failures
+    digests = {hashlib.md5(open(p, "rb").read()).hexdigest() for p in outputs}
+    assert len(digests) == 8
+
+
+def test_process_backend_decodes_each_source_once(tmp_path, monkeypatch):
+    # 进程池由 fork 创建，子进程继承这里替换的解码函数；每次解码往日志文件追加一行
+    import src.ImageBatchProcessor_utils as utils
+
+    log = str(tmp_path / "decodes.log")
+    original = utils.decode_image
+
+    def counting_decode(file, config):
+        with open(log, "a") as f:
+            f.write(f"{file}\n")
+        return original(file, config)
+
+    monkeypatch.setattr(utils, "decode_image", counting_decode)
+    model = ImageBatchModel()
+    model.set_output_dir(str(tmp_path / "out"))
+    sources = []
+    for i in range(3):
+        path = str(tmp_path / "in" / f"src{i}.png")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cv2.imwrite(path, np.full((24, 32, 3), 60 * i, np.uint8))
+        model.files.add(path)
+        sources.append(path)
+    failures = model.process_all(ImageProcessConfig(executor="process", workers=4, variants_per_image=4,
+                                                    resume=False))
+    assert not failures
+    assert len(os.listdir(tmp_path / "out")) == 12
+    with open(log) as f:
+        assert sorted(f.read().split()) == sorted(sources)
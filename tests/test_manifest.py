@@ -0,0 +1,48 @@
+import os
+
+import cv2
+import numpy as np
+
+from src.config import ImageProcessConfig
+from src.ImageBatchProcessor_model import ImageBatchModel
+from src.pipeline import manifest as manifest_module
+from src.pipeline.manifest import RunManifest
+
+
+def _run(tmp_path, source, **kwargs):
+    model = ImageBatchModel()
+    model.set_output_dir(str(tmp_path / "out"))
+    model.add_files([source])
+    records = []
+    model.process_all(ImageProcessConfig(executor="serial", **kwargs),
+                      lambda done, file, record, error: records.append(record))
+    return records
+
+
+def test_more_variants_keeps_existing_outputs(tmp_path):
+    source = str(tmp_path / "a.jpg")
+    cv2.imwrite(source, np.full((24, 32, 3), 120, np.uint8))
+    first = _run(tmp_path, source, variants_per_image=2)
+    mtimes = {r.path: os.stat(r.path).st_mtime_ns for r in first}
+
+    second = _run(tmp_path, source, variants_per_image=3)
+
+    assert sorted(r.path for r in second if r.skipped) == sorted(mtimes)
+    assert [os.path.basename(r.path) for r in second if not r.skipped] == ["mod_a_v3.png"]
+    assert all(os.stat(p).st_mtime_ns == m for p, m in mtimes.items())
+
+
+def test_split_hashes_each_source_once(tmp_path, monkeypatch):
+    source = str(tmp_path / "a.jpg")
+    cv2.imwrite(source, np.full((24, 32, 3), 120, np.uint8))
+    calls = []
+    original = manifest_module.source_hash
+    monkeypatch.setattr(manifest_module, "source_hash", lambda path, content=False: (
+        calls.append(path), original(path, content))[1])
+
+    items = [(source, k) for k in range(1, 6)]
+    pending, done, hashes = RunManifest(str(tmp_path / "m.jsonl")).split(items, "cfg", content=True)
+
+    assert calls == [source]
+    assert pending == items and not done
+    assert set(hashes) == set(items)
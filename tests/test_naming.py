@@ -0,0 +1,50 @@
+import os
+
+import cv2
+import numpy as np
+
+from src.config import ImageProcessConfig
+from src.ImageBatchProcessor_model import ImageBatchModel
+
+
+def _write_image(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cv2.imwrite(path, np.full((24, 32, 3), value, np.uint8))
+
+
+def _run(tmp_path, sources, **kwargs):
+    model = ImageBatchModel()
+    model.set_output_dir(str(tmp_path / "out"))
+    model.add_files(sources)
+    outputs = {}
+    model.process_all(ImageProcessConfig(executor="serial", **kwargs),
+                      lambda done, file, record, error: outputs.__setitem__(file, record.path))
+    return outputs
+
+
+def test_resume_does_not_reuse_skipped_output_names(tmp_path):
+    first = [str(tmp_path / "in" / "img0.jpg"), str(tmp_path / "sub" / "img0.jpg")]
+    for i, path in enumerate(first):
+        _write_image(path, 40 * (i + 1))
+    before = _run(tmp_path, first)
+    assert len(set(before.values())) == 2
+    mtimes = {p: os.stat(p).st_mtime_ns for p in before.values()}
+
+    added = str(tmp_path / "sub2" / "img0.jpg")
+    _write_image(added, 200)
+    after = _run(tmp_path, first + [added])
+
+    assert after[first[0]] == before[first[0]]
+    assert after[first[1]] == before[first[1]]
+    assert after[added] not in before.values()
+    # 已完成的输出没有被新图覆盖
+    assert all(os.stat(p).st_mtime_ns == m for p, m in mtimes.items())
+
+
+def test_overwrite_reuses_name_across_single_calls(tmp_path):
+    src = str(tmp_path / "in" / "x.jpg")
+    _write_image(src, 90)
+    model = ImageBatchModel()
+    model.set_output_dir(str(tmp_path / "out"))
+    config = ImageProcessConfig(overwrite=True)
+    assert model.process_one(src, config).path == model.process_one(src, config).path
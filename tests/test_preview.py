@@ -0,0 +1,26 @@
+import numpy as np
+
+from src.config import ImageProcessConfig
+from src.pipeline.plan import compile_plan
+from src.pipeline.preview import preview_config
+
+
+def _corner_shift(plan, w, h, quantile):
+    """透视偏移取区间内同一分位时，四角相对图像尺寸的位移"""
+    lo, hi = plan.perspective
+    M = plan.geometry(w, h, shift=lo + (hi - lo) * quantile)
+    corners = np.array([[0, 0, 1], [w, 0, 1], [0, h, 1], [w, h, 1]], dtype=np.float64).T
+    moved = M @ corners
+    moved = moved[:2] / moved[2]
+    return (moved - corners[:2]) / np.array([[w], [h]])
+
+
+def test_preview_perspective_matches_full_size():
+    config = ImageProcessConfig(persp_min=10.0, persp_max=40.0, rot_min=0, rot_max=0,
+                                distortion_strength=0)
+    W, H, ratio = 4000, 3000, 0.1
+    full = compile_plan(config)
+    proxy = compile_plan(preview_config(config, ratio))
+    for q in (0.0, 0.5, 1.0):
+        np.testing.assert_allclose(_corner_shift(proxy, int(W * ratio), int(H * ratio), q),
+                                   _corner_shift(full, W, H, q), atol=1e-6)
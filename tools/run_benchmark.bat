@@ -0,0 +1,4 @@
+@echo off
+set PYTHONPATH=%~dp0..
+python -m src.benchmark %*
+pause
\ No newline at end of file